@@ -3,19 +3,30 @@ KRISPER + Bio_Poetica
 Natural language programming and executable poetry
 """
 
-from .krisper import KrisperCompiler, compile_text
-from .bio_poetica import BioPoeticaParser, BioPoeticaCompiler
-from .whitespace_intron_encoder import WhitespaceIntronEncoder
-from .biopoetica_parser import parse_biopoetica
-from .krisper_lowering import lower_to_krsp
+import importlib
 
 __version__ = "0.2.0"
-__all__ = [
-    "KrisperCompiler",
-    "compile_text",
-    "BioPoeticaParser", 
-    "BioPoeticaCompiler",
-    "WhitespaceIntronEncoder",
-    "parse_biopoetica",
-    "lower_to_krsp"
-]
\ No newline at end of file
+
+# Public name -> (submodule, attribute); submodules load on first access
+_EXPORTS = {
+    "KrisperCompiler": ("krisper", "KrisperCompiler"),
+    "compile_text": ("krisper", "compile_text"),
+    "BioPoeticaParser": ("bio_poetica", "BioPoeticaParser"),
+    "BioPoeticaCompiler": ("bio_poetica", "BioPoeticaCompiler"),
+    "WhitespaceIntronEncoder": ("whitespace_encoder", "WhitespaceEncoder"),
+    "parse_biopoetica": ("biopoetica_parser", "parse_biopoetica"),
+    "lower_to_krsp": ("krisper_lowering", "lower_to_krsp"),
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = _EXPORTS[name]
+    value = getattr(importlib.import_module(f".{module_name}", __name__), attr)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -14,21 +14,20 @@ from bio_executor import BioPoeticaExecutor
 def compress_file(filename: str):
     """Compress a file using natural language commands"""
     
-    # Read file
-    with open(filename, 'rb') as f:
-        data = f.read()
+    # The file is mapped by the load op below, never read into memory here
+    size = os.path.getsize(filename)
     
     print(f"📁 File: {filename}")
-    print(f"📏 Original size: {len(data):,} bytes")
+    print(f"📏 Original size: {size:,} bytes")
     
     # Create poem for compression
     poem = f"""name file:compressor
 
 when file "{filename}" loaded:
-    emit "compression.start" {{"size": {len(data)}}}
+    emit "compression.start" {{"size": {size}}}
     
 remember original_data: loaded from "{filename}"
-remember original_size: {len(data)}
+remember original_size: {size}
 
 use compression.maximum(data: original_data)
     
@@ -52,34 +51,44 @@ save compressed_data to "{filename}.kz"
     
     executor = KrisperExecutor()
     
-    # Store original data in executor
-    executor.variables['file_data'] = data.decode('utf-8') if len(data) < 10000 else str(data[:1000])
-    
-    # Compress using KRISPER
-    compress_ir = compile_text(f'compress payload file_data using level=9 as compressed')
-    result = executor.execute(compress_ir)
+    # Map the whole file; compress reads the mapping directly
+    compress_ir = {"version": "0.1", "plan": [
+        {"op": "load", "in": {"path": f"file:{filename}"}, "out": "file_data"},
+        {"op": "compress", "in": {"payload": "file_data"}, "params": {"level": 9}, "out": "compressed"}
+    ]}
+    result = executor.execute(compress_ir, outputs=[])
     
     if result['success']:
-        compressed = result['outputs']['compressed']
-        ratio = len(data) / len(compressed)
+        compressed = executor.variables['compressed'].ascii()
+        ratio = size / len(compressed) if compressed else 0.0
         
         print(f"\n✅ Compression successful!")
         print(f"📦 Compressed size: {len(compressed):,} bytes")
         print(f"📊 Compression ratio: {ratio:.2f}:1")
-        print(f"💾 Saved: {len(data) - len(compressed):,} bytes ({(1 - len(compressed)/len(data))*100:.1f}%)")
+        print(f"💾 Saved: {size - len(compressed):,} bytes ({(1 - len(compressed)/max(size, 1))*100:.1f}%)")
         
         # Save compressed file
         output_file = filename + '.kz'
-        with open(output_file, 'w') as f:
+        with open(output_file, 'wb') as f:
             f.write(compressed)
         print(f"\n💾 Saved to: {output_file}")
         
-        # Verify by decompressing
-        decompress_ir = compile_text(f'decompress data compressed as verified')
-        verify_result = executor.execute(decompress_ir)
+        # Verify by streaming the decompressed bytes into a hash and comparing
+        # it with the mapped original's, so no full-size copy is ever made
+        verify_ir = {"version": "0.1", "plan": [
+            {"op": "decompress_stream", "in": {"source": "compressed"}, "out": "restored"},
+            {"op": "hash", "in": {"data": "restored"}, "out": "restored_hash"},
+            {"op": "hash", "in": {"data": "file_data"}, "out": "original_hash"},
+            {"op": "compare", "in": {"a": "restored_hash", "b": "original_hash"}, "out": "matches"}
+        ]}
+        verify_result = executor.execute(verify_ir, outputs=["matches"])
         
-        if verify_result['success']:
+        if verify_result['success'] and verify_result['outputs']['matches']:
             print("✓ Decompression verified")
+        elif verify_result['success']:
+            print("✗ Verification failed: decompressed data does not match the original")
+        else:
+            print("✗ Verification failed:", verify_result['log'][-1])
     else:
         print("✗ Compression failed:", result['log'])
 
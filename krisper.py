@@ -3,28 +3,53 @@
 KRISPER v0.1 - Natural Language to Intermediate Representation compiler
 Deterministic compilation of constrained NL to executable JSON IR
 """
-import re
-import json
-from typing import Dict, List, Any, Optional, Tuple
+from __future__ import annotations
+
+import os
+import bisect
+import heapq
+
+# Heavier modules (typing, re, json) are only imported when actually needed,
+# keeping `import krisper` and the CLI close to bare interpreter startup
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+    Token = Tuple[int, str]
+
+# Lexer: quoted payloads, words, and any other single non-space symbol
+_TOKEN_PATTERN = r'["\']([^"\']*)["\']|(\w+)|(\S)'
+_STR, _WORD, _SYM = 1, 2, 3  # Token kinds (index of the matching group)
+_token_re = None
+
+def _lexer():
+    """Return the compiled lexer regex, compiling it on first use"""
+    global _token_re
+    if _token_re is None:
+        import re
+        _token_re = re.compile(_TOKEN_PATTERN)
+    return _token_re
+
+# Keywords whose operand is a name, so a verb following them is not a statement
+_NAME_KEYWORDS = {"as", "with"}
+
+IR_VERSION = "0.1"
+__version__ = "0.2.0"  # Compiler version; part of every compile cache key
 
 class ValidationError(Exception):
     """Raised when IR validation fails"""
     pass
 
-class KrisperCompiler:
-    """Compile natural language to KRISPER IR v0.1"""
+class CompileContext:
+    """Per-call compile state: alias table, alias counters and defined variables"""
     
-    def __init__(self):
-        self.version = "0.1"
-        self.verbs = {"compress", "compare", "add", "mul", "attest", "capsule", "mint", "explain"}
-        self.reset()
+    def __init__(self, aliases: Optional[Dict[str, str]] = None,
+                 alias_counter: Optional[Dict[str, int]] = None, defined_vars=None):
+        self.aliases = aliases if aliases is not None else {}
+        self.alias_counter = alias_counter if alias_counter is not None else {}
+        # Track defined variables (alias -> defining op name)
+        self.defined_vars = defined_vars if defined_vars is not None else {}
     
-    def reset(self):
-        """Reset compiler state between compilations"""
-        self.aliases = {}
-        self.alias_counter = {}
-    
-    def _get_alias(self, base: str) -> str:
+    def get_alias(self, base: str) -> str:
         """Generate unique alias"""
         if base not in self.alias_counter:
             self.alias_counter[base] = 0
@@ -32,116 +57,600 @@ class KrisperCompiler:
         if self.alias_counter[base] == 1:
             return base
         return f"{base}{self.alias_counter[base]}"
+
+class KrisperCompiler:
+    """Compile natural language to KRISPER IR v0.1
+    
+    The compiler holds only the immutable grammar; every call gets its own
+    CompileContext, so one instance can be shared freely across threads.
+    """
+    
+    def __init__(self):
+        self.version = IR_VERSION
+        self.verbs = frozenset({"compress", "compare", "add", "mul", "attest", "capsule", "mint", "explain"})
+        # Verb handlers; verbs without one are recognised but emit no op
+        self._handlers = {
+            "compress": self._compile_compress,
+            "compare": self._compile_compare,
+            "attest": self._compile_attest,
+            "explain": self._compile_explain,
+        }
+    
+    def reset(self):
+        """Kept for compatibility; compile state now lives in a CompileContext"""
+    
+    def _statements(self, chunks: Iterable[str]) -> Iterator[Tuple[str, List[Token]]]:
+        """Split lowercased text chunks into (verb, args) statements in a single pass"""
+        verb, args, prev = None, [], None
+        finditer = _lexer().finditer
+        for chunk in chunks:
+            for match in finditer(chunk):
+                kind = match.lastindex
+                value = match.group(kind)
+                # A verb starts a new statement unless it is used as a name
+                if kind == _WORD and value in self.verbs and prev not in _NAME_KEYWORDS:
+                    if verb is not None:
+                        yield verb, args
+                    verb, args = value, []
+                elif verb is not None:
+                    args.append((kind, value))
+                prev = value if kind == _WORD else None
+        if verb is not None:
+            yield verb, args
+    
+    def _compile_statement(self, verb: str, args: List[Token],
+                           ctx: CompileContext) -> Optional[Dict[str, Any]]:
+        """Dispatch a statement to its verb handler, returning the IR op (if any)"""
+        handler = self._handlers.get(verb)
+        if handler is None:
+            return None
+        return handler(args, ctx)
+    
+    def _compile_compress(self, args: List[Token], ctx: CompileContext) -> Optional[Dict[str, Any]]:
+        """compress payload "<text>" [using seed=<n>] [as <alias>]"""
+        if len(args) < 2 or args[0] != (_WORD, "payload") or args[1][0] != _STR:
+            return None
+        payload = args[1][1]
+        
+        # Check for empty payload
+        if not payload:
+            raise ValidationError("EMPTY_PAYLOAD")
+        
+        rest = args[2:]
+        seed = 42
+        if (rest[:3] == [(_WORD, "using"), (_WORD, "seed"), (_SYM, "=")]
+                and len(rest) > 3 and rest[3][1].isdigit()):
+            seed = int(rest[3][1])
+            rest = rest[4:]
+        
+        alias = None
+        if len(rest) > 1 and rest[0] == (_WORD, "as") and rest[1][0] == _WORD:
+            alias = rest[1][1]
+        alias = alias or ctx.get_alias("r")
+        
+        op = {
+            "op": "compress",
+            "in": {"payload": f"utf8:{payload}"},
+            "params": {"use": "fibpi3d", "seed": seed},
+            "out": alias
+        }
+        ctx.defined_vars[alias] = "compress"  # Mark as defined
+        ctx.aliases["last_compress"] = alias
+        ctx.aliases["last_defined"] = alias
+        return op
+    
+    def _compile_compare(self, args: List[Token], ctx: CompileContext) -> Dict[str, Any]:
+        """compare [<a> with <b>]"""
+        # Look for explicit pairs or use last compressed
+        if (len(args) > 2 and args[0][0] == _WORD and args[1] == (_WORD, "with")
+                and args[2][0] == _WORD):
+            a, b = args[0][1], args[2][1]
+            # Check if variables are defined
+            for var in [a, b]:
+                if var not in ctx.defined_vars:
+                    raise ValidationError(f"UNDEFINED_REF:{var}")
+        else:
+            # Default to comparing last compress with itself
+            if "last_compress" not in ctx.aliases:
+                # No compress operation found - can't compare
+                raise ValidationError("UNDEFINED_REF:no_compress_found")
+            a = b = ctx.aliases["last_compress"]
+        
+        cmp_alias = ctx.get_alias("cmp")
+        op = {
+            "op": "compare",
+            "in": {"a": a, "b": b},
+            "out": cmp_alias
+        }
+        ctx.defined_vars[cmp_alias] = "compare"
+        ctx.aliases["last_defined"] = cmp_alias
+        return op
+    
+    def _compile_attest(self, args: List[Token], ctx: CompileContext) -> Dict[str, Any]:
+        """attest"""
+        artifact = ctx.aliases.get("last_compress", "r1")
+        return {
+            "op": "attest",
+            "in": {"artifact": artifact},
+            "out": ctx.get_alias("att")
+        }
+    
+    def _compile_explain(self, args: List[Token], ctx: CompileContext) -> Dict[str, Any]:
+        """explain [<alias>]"""
+        # Find what to explain
+        if args and args[0][0] == _WORD:
+            target = args[0][1]
+            if target not in ctx.defined_vars:
+                raise ValidationError(f"UNDEFINED_REF:{target}")
+        else:
+            # Explain last operation
+            target = ctx.aliases.get("last_defined", "unknown")
+        
+        return {
+            "op": "explain",
+            "in": {"ref": target},
+            "out": "_explanation"
+        }
+    
+    def _compile_chunks(self, chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Yield IR ops for lowercased text chunks, keeping only the alias table"""
+        ctx = CompileContext()
+        
+        # Read the input once, dispatching each statement by its leading verb
+        for verb, args in self._statements(chunks):
+            op = self._compile_statement(verb, args, ctx)
+            if op is not None:
+                yield op
     
     def compile(self, text: str) -> Dict[str, Any]:
-        """Compile NL text to IR"""
-        self.reset()
+        """Compile NL text to IR
+        
+        Ops are emitted in statement order and a reference must name an alias
+        defined by an earlier statement, so "compare x with y" before the
+        compresses that define x and y raises UNDEFINED_REF:x.
+        """
         text = (text or "").strip().lower()
         
         # Check for empty payload
         if not text:
             raise ValidationError("EMPTY_PAYLOAD")
         
-        plan = []
-        defined_vars = set()  # Track defined variables
-        
-        # Parse compress operations
-        compress_pattern = r'compress\s+payload\s+["\']([^"\']*)["\'](?:\s+using\s+seed=(\d+))?(?:\s+as\s+(\w+))?'
-        for match in re.finditer(compress_pattern, text):
-            payload, seed, alias = match.groups()
-            
-            # Check for empty payload
-            if not payload:
-                raise ValidationError("EMPTY_PAYLOAD")
-            
-            seed = int(seed) if seed else 42
-            alias = alias or self._get_alias("r")
-            
-            plan.append({
-                "op": "compress",
-                "in": {"payload": f"utf8:{payload}"},
-                "params": {"use": "fibpi3d", "seed": seed},
-                "out": alias
-            })
-            defined_vars.add(alias)  # Mark as defined
-            self.aliases["last_compress"] = alias
-        
-        # Parse compare operations
-        if "compare" in text:
-            # Look for explicit pairs or use last compressed
-            compare_pattern = r'compare\s+(\w+)\s+with\s+(\w+)'
-            match = re.search(compare_pattern, text)
-            if match:
-                a, b = match.groups()
-                # Check if variables are defined
-                for var in [a, b]:
-                    if var not in defined_vars:
-                        raise ValidationError(f"UNDEFINED_REF:{var}")
-            else:
-                # Default to comparing last compress with itself
-                if "last_compress" not in self.aliases:
-                    # No compress operation found - can't compare
-                    raise ValidationError("UNDEFINED_REF:no_compress_found")
-                a = b = self.aliases["last_compress"]
-            
-            cmp_alias = self._get_alias("cmp")
-            plan.append({
-                "op": "compare",
-                "in": {"a": a, "b": b},
-                "out": cmp_alias
-            })
-            defined_vars.add(cmp_alias)
-        
-        # Parse attest operations
-        if "attest" in text:
-            artifact = self.aliases.get("last_compress", "r1")
-            plan.append({
-                "op": "attest",
-                "in": {"artifact": artifact},
-                "out": self._get_alias("att")
-            })
-        
-        # Parse explain operations  
-        if "explain" in text:
-            # Find what to explain
-            explain_pattern = r'explain\s+(\w+)'
-            match = re.search(explain_pattern, text)
-            if match:
-                target = match.group(1)
-                if target not in defined_vars:
-                    raise ValidationError(f"UNDEFINED_REF:{target}")
-            else:
-                # Explain last operation
-                target = list(defined_vars)[-1] if defined_vars else "unknown"
-            
-            plan.append({
-                "op": "explain",
-                "in": {"ref": target},
-                "out": "_explanation"
-            })
+        plan = list(self._compile_chunks([text]))
         
         # Build IR
         return {
             "version": self.version,
             "plan": plan
         }
+    
+    def compile_stream(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Compile NL text from a line iterator, yielding IR ops one at a time
+        
+        Statements may span lines, but quoted payloads may not. Each op is
+        yielded once the next statement (or the end of input) is reached.
+        """
+        nonblank = False
+        
+        def lowered():
+            nonlocal nonblank
+            for line in lines:
+                if not nonblank and line and not line.isspace():
+                    nonblank = True
+                yield line.lower()
+        
+        yield from self._compile_chunks(lowered())
+        
+        # Check for empty payload
+        if not nonblank:
+            raise ValidationError("EMPTY_PAYLOAD")
 
-def compile_text(text: str) -> str:
-    """Convenience function to compile text to JSON"""
-    compiler = KrisperCompiler()
+def _lex(chunk: str) -> List[Token]:
+    """Tokenize one lowercased chunk of text"""
+    return [(m.lastindex, m.group(m.lastindex)) for m in _lexer().finditer(chunk)]
+
+# Alias state a statement compiles against: (last_compress, last_defined)
+_INITIAL_STATE = (None, None)
+_SEQ_GAP = 1024.0
+
+class _Line:
+    """One source line: its tokens and the statements that start on it"""
+    __slots__ = ("text", "tokens", "starts", "stmts")
+    
+    def __init__(self, text: str, tokens: List[Token]):
+        self.text = text
+        self.tokens = tokens
+        self.starts: List[int] = []
+        self.stmts: List[_Stmt] = []
+
+class _Stmt:
+    """One statement with its compiled op and the alias state around it"""
+    __slots__ = ("verb", "args", "seq", "op", "error", "state_in", "state_out",
+                 "defs", "uses", "allocs")
+    
+    def __init__(self, verb: str):
+        self.verb = verb
+        self.args: List[Token] = []
+        self.seq = 0.0  # Program order; sparse so edits can insert between
+        self.op: Optional[Dict[str, Any]] = None
+        self.error: Optional[ValidationError] = None
+        self.state_in: Optional[tuple] = None
+        self.state_out: Optional[tuple] = None
+        self.defs: List[str] = []
+        self.uses: List[str] = []
+        self.allocs: List[str] = []  # Auto-alias bases it numbered
+
+class _Scope:
+    """defined_vars for one statement, answered from the session's def index"""
+    
+    def __init__(self, session: "CompileSession", seq: float):
+        self.session = session
+        self.seq = seq
+        self.defs = []
+        self.uses = []
+    
+    def __contains__(self, alias: str) -> bool:
+        self.uses.append(alias)
+        seqs = self.session._defs.get(alias)
+        return bool(seqs) and seqs[0] < self.seq
+    
+    def __setitem__(self, alias: str, op_name: str):
+        self.defs.append(alias)
+
+class CompileSession:
+    """Incrementally recompile a KRISPER program as its lines are edited
+    
+    Only the edited lines are re-lexed. Statements they touch are recompiled,
+    followed by any statement whose alias state or referenced aliases changed
+    as a result, and `plan` is patched in place. Adding or removing an
+    auto-numbered alias (r, cmp, att) renumbers the later ones of that base.
+    """
+    
+    def __init__(self, text: str = "", compiler: Optional[KrisperCompiler] = None):
+        self.compiler = compiler or KrisperCompiler()
+        self.plan = []
+        self._plan_seqs = []
+        self._lines = []
+        self._stmts = []  # Statements in program order
+        self._seqs = []   # Their seqs, for bisecting
+        self._defs = {}   # alias -> sorted seqs of defining statements
+        self._uses = {}   # alias -> statements that looked it up
+        self._allocs = {} # auto-alias base -> sorted seqs of statements numbering it
+        self._errors = {}
+        self._nonblank = 0
+        if text:
+            self.edit(0, 0, text.splitlines())
+    
+    def ir(self) -> Dict[str, Any]:
+        """Return the current IR, raising the first ValidationError in program order"""
+        if not self._nonblank:
+            raise ValidationError("EMPTY_PAYLOAD")
+        if self._errors:
+            raise self._errors[min(self._errors, key=lambda stmt: stmt.seq)]
+        return {
+            "version": self.compiler.version,
+            "plan": self.plan
+        }
+    
+    @property
+    def errors(self) -> List[ValidationError]:
+        """All current validation errors in program order"""
+        return [self._errors[stmt] for stmt in sorted(self._errors, key=lambda stmt: stmt.seq)]
+    
+    @property
+    def text(self) -> str:
+        return "\n".join(line.text for line in self._lines)
+    
+    def edit(self, start: int, end: int, new_lines: List[str]):
+        """Replace lines [start, end) with new_lines and recompile what they affect"""
+        verbs = self.compiler.verbs
+        records = [_Line(line, _lex(line.lower())) for line in new_lines]
+        old = self._lines[start:end]
+        removed = [stmt for line in old for stmt in line.stmts]
+        self._nonblank += sum(1 for r in records if r.tokens) - sum(1 for r in old if r.tokens)
+        
+        # The statement open before the edit may gain or lose trailing tokens
+        first = start - 1
+        while first >= 0 and not self._lines[first].starts:
+            first -= 1
+        prev = None
+        if first < 0:
+            for line in reversed(self._lines[:start]):
+                if line.tokens:
+                    kind, value = line.tokens[-1]
+                    prev = value if kind == _WORD else None
+                    break
+        
+        self._lines[start:end] = records
+        region_end = start + len(records)
+        formed = []
+        current = None
+        
+        def open_stmt(line: _Line, index: int, verb: str) -> _Stmt:
+            stmt = _Stmt(verb)
+            line.starts.append(index)
+            line.stmts.append(stmt)
+            formed.append(stmt)
+            return stmt
+        
+        if first >= 0:
+            line = self._lines[first]
+            index = line.starts.pop()
+            removed.insert(0, line.stmts.pop())
+            current = open_stmt(line, index, line.tokens[index][1])
+            current.args.extend(line.tokens[index + 1:])
+            kind, value = line.tokens[-1]
+            prev = value if kind == _WORD else None
+            lineno = first + 1
+        else:
+            lineno = start
+        
+        # Re-form statements until one starts exactly where it did before
+        while lineno < len(self._lines):
+            line = self._lines[lineno]
+            if lineno >= region_end:
+                starts, p = [], prev
+                for index, (kind, value) in enumerate(line.tokens):
+                    if kind == _WORD and value in verbs and p not in _NAME_KEYWORDS:
+                        starts.append(index)
+                    p = value if kind == _WORD else None
+                if starts and starts == line.starts:
+                    if current is not None:
+                        current.args.extend(line.tokens[:starts[0]])
+                    break
+                removed.extend(line.stmts)
+                line.starts, line.stmts = [], []
+            for index, token in enumerate(line.tokens):
+                kind, value = token
+                # A verb starts a new statement unless it is used as a name
+                if kind == _WORD and value in verbs and prev not in _NAME_KEYWORDS:
+                    current = open_stmt(line, index, value)
+                elif current is not None:
+                    current.args.append(token)
+                prev = value if kind == _WORD else None
+            lineno += 1
+        
+        self._splice(removed, formed)
+    
+    def _splice(self, removed: List[_Stmt], formed: List[_Stmt]):
+        """Swap removed statements for formed ones and recompile the fallout"""
+        from collections import Counter
+        removed_defs, removed_allocs = set(), Counter()
+        for stmt in removed:
+            self._unindex(stmt)
+            removed_defs.update(stmt.defs)
+            removed_allocs.update(stmt.allocs)
+        
+        if removed:
+            lo = bisect.bisect_left(self._seqs, min(stmt.seq for stmt in removed))
+        else:
+            # Nothing was replaced, so the new statements come first
+            lo = 0
+        hi = lo + len(removed)
+        
+        low_seq = self._seqs[lo - 1] if lo else 0.0
+        high_seq = self._seqs[hi] if hi < len(self._seqs) else low_seq + (len(formed) + 1) * _SEQ_GAP
+        step = (high_seq - low_seq) / (len(formed) + 1)
+        for n, stmt in enumerate(formed, 1):
+            stmt.seq = low_seq + n * step
+        self._stmts[lo:hi] = formed
+        self._seqs[lo:hi] = [stmt.seq for stmt in formed]
+        if formed and step < 1e-6:
+            self._renumber()
+        
+        # Compile the new statements in order against the state before them
+        state = self._stmts[lo - 1].state_out if lo else _INITIAL_STATE
+        for stmt in formed:
+            self._compile(stmt, state)
+            self._index(stmt)
+            state = stmt.state_out
+        
+        # Later statements only care about what the region defines as a whole
+        region_seq = self._seqs[lo + len(formed) - 1] if lo + len(formed) else -1.0
+        pending = []
+        formed_defs = {alias for stmt in formed for alias in stmt.defs}
+        for alias in removed_defs.symmetric_difference(formed_defs):
+            pending.extend(user for user in self._uses.get(alias, ()) if user.seq > region_seq)
+        formed_allocs = Counter(base for stmt in formed for base in stmt.allocs)
+        for base in set(removed_allocs) | set(formed_allocs):
+            if removed_allocs[base] != formed_allocs[base]:
+                pending.extend(self._allocators_after(base, region_seq))
+        after = lo + len(formed)
+        if after < len(self._stmts) and self._stmts[after].state_in != state:
+            pending.append(self._stmts[after])
+        self._recompile(pending)
+    
+    def _recompile(self, pending: List[_Stmt]):
+        """Recompile statements in program order, following state and def-use changes"""
+        heap = [(stmt.seq, id(stmt), stmt) for stmt in set(pending)]
+        heapq.heapify(heap)
+        queued = {stmt for _, _, stmt in heap}
+        
+        def push(stmt: _Stmt):
+            if stmt not in queued:
+                queued.add(stmt)
+                heapq.heappush(heap, (stmt.seq, id(stmt), stmt))
+        
+        while heap:
+            _, _, stmt = heapq.heappop(heap)
+            index = bisect.bisect_left(self._seqs, stmt.seq)
+            state = self._stmts[index - 1].state_out if index else _INITIAL_STATE
+            
+            old_op, old_defs, old_allocs = stmt.op, stmt.defs, stmt.allocs
+            self._unindex(stmt, keep_plan=True)
+            self._compile(stmt, state)
+            self._index(stmt, old_op)
+            
+            for alias in set(old_defs).symmetric_difference(stmt.defs):
+                for user in self._uses.get(alias, ()):
+                    if user.seq > stmt.seq:
+                        push(user)
+            for base in set(old_allocs).symmetric_difference(stmt.allocs):
+                for later in self._allocators_after(base, stmt.seq):
+                    push(later)
+            if index + 1 < len(self._stmts) and self._stmts[index + 1].state_in != stmt.state_out:
+                push(self._stmts[index + 1])
+    
+    def _compile(self, stmt: _Stmt, state: tuple):
+        """Compile one statement against the alias state that precedes it"""
+        last_compress, last_defined = state
+        counters = {base: bisect.bisect_left(seqs, stmt.seq) for base, seqs in self._allocs.items()}
+        scope = _Scope(self, stmt.seq)
+        ctx = CompileContext(alias_counter=dict(counters), defined_vars=scope)
+        if last_compress is not None:
+            ctx.aliases["last_compress"] = last_compress
+        if last_defined is not None:
+            ctx.aliases["last_defined"] = last_defined
+        
+        stmt.state_in = state
+        try:
+            stmt.op = self.compiler._compile_statement(stmt.verb, stmt.args, ctx)
+            stmt.error = None
+            stmt.state_out = (ctx.aliases.get("last_compress"), ctx.aliases.get("last_defined"))
+            stmt.allocs = [base for base, n in ctx.alias_counter.items()
+                           if n > counters.get(base, 0)]
+        except ValidationError as e:
+            # A failed statement leaves the alias state untouched
+            stmt.op, stmt.error, stmt.state_out = None, e, state
+            scope.defs, stmt.allocs = [], []
+        stmt.defs, stmt.uses = scope.defs, scope.uses
+    
+    def _allocators_after(self, base: str, seq: float) -> List[_Stmt]:
+        """Statements after seq that number an auto alias of base"""
+        seqs = self._allocs.get(base, [])
+        return [self._stmts[bisect.bisect_left(self._seqs, later)]
+                for later in seqs[bisect.bisect_right(seqs, seq):]]
+    
+    def _index(self, stmt: _Stmt, old_op: Optional[Dict[str, Any]] = None):
+        for alias in stmt.defs:
+            bisect.insort(self._defs.setdefault(alias, []), stmt.seq)
+        for alias in stmt.uses:
+            self._uses.setdefault(alias, set()).add(stmt)
+        for base in stmt.allocs:
+            bisect.insort(self._allocs.setdefault(base, []), stmt.seq)
+        if stmt.error is not None:
+            self._errors[stmt] = stmt.error
+        
+        position = bisect.bisect_left(self._plan_seqs, stmt.seq)
+        if old_op is not None and stmt.op is not None:
+            self.plan[position] = stmt.op  # Patch in place
+        elif old_op is not None:
+            del self.plan[position], self._plan_seqs[position]
+        elif stmt.op is not None:
+            self.plan.insert(position, stmt.op)
+            self._plan_seqs.insert(position, stmt.seq)
+    
+    def _unindex(self, stmt: _Stmt, keep_plan: bool = False):
+        for alias in stmt.defs:
+            seqs = self._defs[alias]
+            del seqs[bisect.bisect_left(seqs, stmt.seq)]
+            if not seqs:
+                del self._defs[alias]
+        for alias in stmt.uses:
+            users = self._uses.get(alias)
+            if users is not None:
+                users.discard(stmt)
+                if not users:
+                    del self._uses[alias]
+        for base in stmt.allocs:
+            seqs = self._allocs[base]
+            del seqs[bisect.bisect_left(seqs, stmt.seq)]
+        self._errors.pop(stmt, None)
+        if stmt.op is not None and not keep_plan:
+            position = bisect.bisect_left(self._plan_seqs, stmt.seq)
+            del self.plan[position], self._plan_seqs[position]
+    
+    def _renumber(self):
+        """Respace statement seqs once repeated edits exhaust the gaps"""
+        for n, stmt in enumerate(self._stmts, 1):
+            stmt.seq = n * _SEQ_GAP
+        self._seqs = [stmt.seq for stmt in self._stmts]
+        self._plan_seqs = [stmt.seq for stmt in self._stmts if stmt.op is not None]
+        self._defs, self._allocs = {}, {}
+        for stmt in self._stmts:
+            for alias in stmt.defs:
+                self._defs.setdefault(alias, []).append(stmt.seq)
+            for base in stmt.allocs:
+                self._allocs.setdefault(base, []).append(stmt.seq)
+
+_compile_cache = None
+_compiler = None
+
+def _shared_compiler() -> KrisperCompiler:
+    """One stateless compiler serves every compile_text call and thread"""
+    global _compiler
+    if _compiler is None:
+        _compiler = KrisperCompiler()
+    return _compiler
+
+def configure_cache(maxsize: int = 4096, cache_dir: Optional[str] = None):
+    """Replace the compile_text cache (cache_dir enables the on-disk tier)"""
+    global _compile_cache
+    from krisper_cache import CompileCache
+    _compile_cache = CompileCache(maxsize=maxsize, cache_dir=cache_dir)
+    return _compile_cache
+
+def get_cache():
+    """Return the compile_text cache, creating it on first use"""
+    if _compile_cache is None:
+        configure_cache(cache_dir=os.environ.get("KRISPER_CACHE_DIR") or None)
+    return _compile_cache
+
+def _render(text: str) -> str:
+    """Compile text to pretty-printed JSON (errors included), uncached"""
+    import json
     try:
-        ir = compiler.compile(text)
+        ir = _shared_compiler().compile(text)
         return json.dumps(ir, indent=2)
     except ValidationError as e:
         return json.dumps({"error": str(e)}, indent=2)
 
-if __name__ == "__main__":
+def compile_text(text: str) -> str:
+    """Convenience function to compile text to JSON"""
+    cache = get_cache()
+    key = cache.key((text or "").strip().lower(), f"{IR_VERSION}/{__version__}")
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    result = _render(text)
+    cache.put(key, result)
+    return result
+
+def _compile_one(text: str) -> Dict[str, Any]:
+    """Compile one text in a worker, reporting validation errors as data"""
+    try:
+        return _shared_compiler().compile(text)
+    except ValidationError as e:
+        return {"error": str(e)}
+
+def compile_many(texts: Iterable[str], workers: Optional[int] = None,
+                 chunksize: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Compile many independent texts across a process pool
+    
+    Results are IR dicts in input order; a text that fails validation yields
+    {"error": ...} in its slot instead of aborting the batch.
+    """
+    texts = list(texts)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(texts) <= 1:
+        return [_compile_one(text) for text in texts]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    # A few chunks per worker keeps IPC overhead low while balancing load
+    if chunksize is None:
+        chunksize = max(1, len(texts) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_compile_one, texts, chunksize=chunksize))
+
+def main():
+    """Console entry point: compile arguments, or run an interactive loop"""
     import sys
     
     if len(sys.argv) > 1:
-        # Command line usage
+        # Command line usage; a one-shot run only benefits from the disk cache
         text = " ".join(sys.argv[1:])
-        print(compile_text(text))
+        print(compile_text(text) if os.environ.get("KRISPER_CACHE_DIR") else _render(text))
     else:
         # Interactive mode
         print("KRISPER v0.1 - Natural Language to Code")
@@ -162,4 +671,7 @@ if __name__ == "__main__":
                 break
             except Exception as e:
                 print(f"Error: {e}")
-                print()
\ No newline at end of file
+                print()
+
+if __name__ == "__main__":
+    main()
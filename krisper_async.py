@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+KRISPER Async Executor - Runs plans on an asyncio event loop
+I/O ops (http_get, write_file, run, sleep, loop) are awaited; CPU-bound ops
+share KrisperExecutor's handlers and go to a thread pool when inputs are large
+"""
+
+import asyncio
+import ssl
+from urllib.parse import urlsplit, urljoin
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from krisper_executor import (KrisperExecutor, STREAM_CHUNK, _ORDERED_OPS,
+                              _dependencies, _iter_chunks)
+from krisper_validator import PLAN, SCHEMA, compile_validator
+from krisper_values import Base64Value, FileRef, public
+
+# Inputs at least this large are handled off the event loop; smaller ones
+# finish faster than a thread handoff
+OFFLOAD_BYTES = 64 * 1024
+
+HTTP_TIMEOUT = 30.0
+MAX_REDIRECTS = 5
+
+_SECONDS = ((int, float), None)
+
+ASYNC_SCHEMA = dict(SCHEMA, **{
+    'http_get': {'in': ('url',), 'params': {'timeout': _SECONDS}},
+    'write_file': {'in': ('data', 'path')},
+    'run': {'in': ('cmd',), 'params': {'timeout': _SECONDS}},
+    'sleep': {'params': {'seconds': _SECONDS}},
+    'loop': {'params': {'body': PLAN, 'interval': _SECONDS, 'count': (int, range(1, 1 << 31))}},
+})
+
+validate_async = compile_validator(ASYNC_SCHEMA)
+
+# Side-effecting I/O ops are barriers like _ORDERED_OPS; http_get runs as soon as its inputs are ready
+_ASYNC_ORDERED_OPS = _ORDERED_OPS | {'write_file', 'run', 'sleep', 'loop'}
+
+def _input_size(value: Any) -> int:
+    if isinstance(value, Base64Value):
+        return len(value.raw)
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    return 0
+
+class AsyncKrisperExecutor(KrisperExecutor):
+    """KrisperExecutor whose execute is a coroutine
+
+    Within a plan, ops run as soon as their inputs are ready, so two
+    downloads overlap; side-effecting ops keep plan order, and ops after
+    one wait for it (a load sees an earlier write_file). Independent
+    plans can run concurrently on one loop (see execute_many): each reads
+    its own results first and commits its outputs to self.variables only
+    when it finishes.
+    """
+
+    _validator = staticmethod(validate_async)
+
+    def __init__(self, *args, pool: Any = None, offload_bytes: int = OFFLOAD_BYTES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool  # concurrent.futures executor for CPU ops; None uses the loop's default
+        self.offload_bytes = offload_bytes
+        self.io_operations = {
+            'http_get': self._aop_http_get,
+            'write_file': self._aop_write_file,
+            'run': self._aop_run,
+            'sleep': self._aop_sleep,
+            'loop': self._aop_loop,
+        }
+
+    async def execute(self, ir: Dict[str, Any], validate: bool = False,
+                      outputs: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Execute a plan; same arguments and results as KrisperExecutor.execute"""
+        results = {
+            'success': True,
+            'outputs': {},
+            'log': []
+        }
+        ir = self._prepare(ir, results, validate)
+        if ir is None:
+            return results
+
+        produced = await self._run_async(ir.get('plan', []), results)
+        self.variables.update(produced)
+        wanted = produced.keys() if outputs is None else set(outputs)
+        results['outputs'] = {name: public(value) for name, value in produced.items() if name in wanted}
+        return results
+
+    async def execute_many(self, irs: Iterable[Dict[str, Any]], validate: bool = False,
+                           outputs: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Execute plans concurrently; results are in the order of irs"""
+        names = None if outputs is None else list(outputs)
+        return list(await asyncio.gather(*(self.execute(ir, validate, names) for ir in irs)))
+
+    async def _run_async(self, plan: List[Dict[str, Any]], results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run ops as tasks gated on their dependencies; commit in plan order
+
+        Like KrisperExecutor._run_parallel, results up to the first failure
+        are kept and ops past it may run but are discarded.
+        """
+        refs, needs = _dependencies(plan, _ASYNC_ORDERED_OPS)
+        tasks = []
+
+        async def run(index: int) -> Any:
+            for dep in needs[index]:
+                await tasks[dep]  # Re-raises a failed dependency's error
+            bindings = {name: tasks[dep].result() for name, dep in refs[index].items()}
+            return await self._execute_op_async(plan[index], bindings)
+
+        # Every task exists before any of them starts running
+        tasks.extend(asyncio.ensure_future(run(index)) for index in range(len(plan)))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        produced = {}
+        for op, task in zip(plan, tasks):
+            if task.exception() is not None:
+                results['success'] = False
+                results['log'].append(f"✗ {op['op']}: {str(task.exception())}")
+                break
+            if op.get('out'):
+                produced[op['out']] = task.result()
+            results['log'].append(f"✓ {op['op']} → {op.get('out', 'void')}")
+        return produced
+
+    async def _execute_op_async(self, op: Dict[str, Any], bindings: Dict[str, Any]) -> Any:
+        """Await an I/O op, or run a CPU op inline or on the pool by input size"""
+        op_name = op['op']
+        handler = self.io_operations.get(op_name)
+        if handler is None and op_name not in self.operations:
+            raise ValueError(f"Unknown operation: {op_name}")
+        inputs = self._resolve_inputs(op.get('in', {}), bindings)
+        params = op.get('params', {})
+        if handler is not None:
+            return await handler(inputs, params)
+        if sum(_input_size(value) for value in inputs.values()) < self.offload_bytes:
+            return self._apply(op_name, op.get('in', {}), inputs, params)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, self._apply, op_name, op.get('in', {}), inputs, params)
+
+    async def _aop_http_get(self, inputs: Dict, params: Dict) -> bytes:
+        """Fetch a URL over HTTP/1.1 and return the body, following redirects"""
+        url = str(inputs.get('url', ''))
+        timeout = params.get('timeout', HTTP_TIMEOUT)
+        for _ in range(MAX_REDIRECTS + 1):
+            try:
+                status, headers, body = await asyncio.wait_for(_http_request(url), timeout)
+            except asyncio.TimeoutError:
+                raise ValueError(f"Timed out after {timeout}s fetching {url}")
+            if status in (301, 302, 303, 307, 308) and 'location' in headers:
+                url = urljoin(url, headers['location'])
+                continue
+            if not 200 <= status < 300:
+                raise ValueError(f"HTTP {status} from {url}")
+            return body
+        raise ValueError(f"Too many redirects from {inputs.get('url')}")
+
+    async def _aop_write_file(self, inputs: Dict, params: Dict) -> Dict[str, Any]:
+        """Write data (text, bytes, a chunk stream or a file: reference) to a file: path"""
+        path = inputs.get('path')
+        if not isinstance(path, FileRef):
+            raise ValueError(f"write_file path must be a file: reference, got {path!r}")
+
+        def write() -> Dict[str, Any]:
+            written = 0
+            with open(path.path, 'wb') as f:
+                for chunk in _iter_chunks(inputs.get('data', ''), STREAM_CHUNK):
+                    written += f.write(chunk)
+            return {'bytes_out': written, 'path': path.path}
+
+        return await asyncio.get_running_loop().run_in_executor(self.pool, write)
+
+    async def _aop_run(self, inputs: Dict, params: Dict) -> str:
+        """Run a shell command and return its stdout; a non-zero exit fails the op"""
+        process = await asyncio.create_subprocess_shell(
+            str(inputs.get('cmd', '')), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), params.get('timeout'))
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise ValueError(f"Command timed out after {params['timeout']}s")
+        if process.returncode:
+            detail = stderr.decode('utf-8', 'replace').strip()
+            raise ValueError(f"Command exited with {process.returncode}" + (f": {detail}" if detail else ""))
+        return stdout.decode('utf-8', 'replace')
+
+    async def _aop_sleep(self, inputs: Dict, params: Dict) -> None:
+        await asyncio.sleep(params.get('seconds', 0))
+
+    async def _aop_loop(self, inputs: Dict, params: Dict) -> int:
+        """Run the body plan count times (forever if unset), interval seconds apart
+
+        Body ops see this executor's variables but not the enclosing plan's
+        results. Returns the number of iterations run.
+        """
+        body, count = params.get('body', []), params.get('count')
+        iterations = 0
+        while count is None or iterations < count:
+            if iterations:
+                await asyncio.sleep(params.get('interval', 0))
+            results = {'success': True, 'log': []}
+            await self._run_async(body, results)
+            iterations += 1
+            if not results['success']:
+                raise ValueError(f"iteration {iterations}: {results['log'][-1][2:]}")
+        return iterations
+
+async def _http_request(url: str) -> Tuple[int, Dict[str, str], bytes]:
+    """One GET request on a fresh connection: (status, lower-cased headers, body)"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=ssl.create_default_context() if secure else None)
+    try:
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        writer.write((f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+                      "Connection: close\r\nAccept-Encoding: identity\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        status_line = (await reader.readline()).decode('latin-1').split(None, 2)
+        if len(status_line) < 2 or not status_line[0].startswith('HTTP/'):
+            raise ValueError(f"Malformed HTTP response from {url}")
+        status = int(status_line[1])
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';', 1)[0], 16)
+                if size == 0:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)  # CRLF after each chunk
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+        return status, headers, body
+    finally:
+        writer.close()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+KRISPER Binary IR - Compact length-prefixed encoding of KRISPER IR
+Payloads are stored as raw bytes and decoded as zero-copy memoryviews;
+JSON remains the human-readable debug format.
+"""
+
+import json
+import struct
+from typing import Dict, Any, Union
+
+MAGIC = b"KRIR"
+FORMAT_VERSION = 1
+
+# Input value tags
+TAG_STR = 0   # Variable reference or plain string
+TAG_UTF8 = 1  # Literal payload ("utf8:..." in JSON), stored as raw bytes
+TAG_JSON = 2  # Any other JSON value
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+
+def _pack_str(fmt: struct.Struct, text: str) -> bytes:
+    data = text.encode('utf-8')
+    return fmt.pack(len(data)) + data
+
+def encode_ir(ir: Union[Dict[str, Any], str]) -> bytes:
+    """Encode an IR document (dict or JSON text) in the binary format"""
+    if isinstance(ir, str):
+        ir = json.loads(ir)
+    plan = ir.get('plan', [])
+    parts = [MAGIC, _U8.pack(FORMAT_VERSION), _pack_str(_U8, str(ir.get('version', ''))),
+             _U32.pack(len(plan))]
+
+    for op in plan:
+        parts.append(_pack_str(_U8, op['op']))
+        parts.append(_pack_str(_U16, op.get('out') or ''))
+        inputs = op.get('in', {})
+        parts.append(_U16.pack(len(inputs)))
+        for key, value in inputs.items():
+            parts.append(_pack_str(_U16, key))
+            if isinstance(value, str) and value.startswith('utf8:'):
+                tag, data = TAG_UTF8, value[5:].encode('utf-8')
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                tag, data = TAG_UTF8, value
+            elif isinstance(value, str):
+                tag, data = TAG_STR, value.encode('utf-8')
+            else:
+                tag, data = TAG_JSON, json.dumps(value).encode('utf-8')
+            parts.append(_U8.pack(tag))
+            parts.append(_U32.pack(len(data)))
+            parts.append(data)
+        params = op.get('params')
+        data = json.dumps(params, separators=(',', ':')).encode('utf-8') if params else b''
+        parts.append(_U32.pack(len(data)))
+        parts.append(data)
+
+    return b''.join(parts)
+
+def is_binary_ir(data: Any) -> bool:
+    """True if data is a buffer holding binary IR"""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == MAGIC
+
+def decode_ir(data: Buffer) -> Dict[str, Any]:
+    """Decode binary IR; literal payloads are memoryviews into data"""
+    view = memoryview(data).cast('B')
+    if bytes(view[:4]) != MAGIC:
+        raise ValueError("Not binary KRISPER IR")
+    if view[4] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported binary IR format: {view[4]}")
+    pos = 5
+
+    def read(fmt: struct.Struct) -> memoryview:
+        nonlocal pos
+        (size,) = fmt.unpack_from(view, pos)
+        pos += fmt.size
+        field = view[pos:pos + size]
+        if len(field) != size:
+            raise ValueError("Truncated binary IR")
+        pos += size
+        return field
+
+    def read_str(fmt: struct.Struct) -> str:
+        return str(read(fmt), 'utf-8')
+
+    version = read_str(_U8)
+    (count,) = _U32.unpack_from(view, pos)
+    pos += _U32.size
+
+    plan = []
+    for _ in range(count):
+        op = {'op': read_str(_U8)}
+        out = read_str(_U16)
+        (n_inputs,) = _U16.unpack_from(view, pos)
+        pos += _U16.size
+        inputs = {}
+        for _ in range(n_inputs):
+            key = read_str(_U16)
+            tag = view[pos]
+            pos += 1
+            field = read(_U32)
+            if tag == TAG_UTF8:
+                inputs[key] = field
+            elif tag == TAG_STR:
+                inputs[key] = str(field, 'utf-8')
+            elif tag == TAG_JSON:
+                inputs[key] = json.loads(str(field, 'utf-8'))
+            else:
+                raise ValueError(f"Unknown input tag: {tag}")
+        op['in'] = inputs
+        params = read(_U32)
+        if params:
+            op['params'] = json.loads(str(params, 'utf-8'))
+        if out:
+            op['out'] = out
+        plan.append(op)
+
+    return {'version': version, 'plan': plan}
+
+def to_json(ir: Union[Dict[str, Any], Buffer], indent: int = 2) -> str:
+    """Render binary or decoded IR as the JSON debug format"""
+    if not isinstance(ir, dict):
+        ir = decode_ir(ir)
+
+    def default(value):
+        if isinstance(value, memoryview):
+            return 'utf8:' + str(value, 'utf-8')
+        raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+    return json.dumps(ir, indent=indent, default=default)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+KRISPER Blob Store - Content-addressed storage for large IR payloads
+Plans reference payloads as "blob:<sha256>"; entries are memory-mapped on read
+"""
+
+import os
+import mmap
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, Optional, Union
+
+PREFIX = 'blob:'
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+class BlobStore:
+    """Store payloads on disk under their SHA-256 and map them back zero-copy"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._maps = {}  # digest -> memoryview over the open mapping
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, data: Union[str, Buffer]) -> str:
+        """Store data (str is stored as UTF-8) and return its blob reference"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never map a partial entry
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                os.unlink(tmp)
+                raise
+        return PREFIX + digest
+
+    def open(self, ref: str) -> memoryview:
+        """Map a blob read-only; repeated opens share one mapping"""
+        digest = _digest(ref)
+        with self._lock:
+            view = self._maps.get(digest)
+            if view is None:
+                try:
+                    with open(self._path(digest), 'rb') as f:
+                        if os.fstat(f.fileno()).st_size:
+                            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                        else:
+                            view = memoryview(b'')  # mmap refuses empty files
+                except FileNotFoundError:
+                    raise ValueError(f"Unknown blob: {ref}") from None
+                self._maps[digest] = view
+            return view
+
+    def size(self, ref: str) -> int:
+        """Size in bytes of a stored blob"""
+        try:
+            return os.path.getsize(self._path(_digest(ref)))
+        except FileNotFoundError:
+            raise ValueError(f"Unknown blob: {ref}") from None
+
+    def __contains__(self, ref: str) -> bool:
+        return os.path.exists(self._path(_digest(ref)))
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(PREFIX)
+
+def _digest(ref: str) -> str:
+    digest = ref[len(PREFIX):] if ref.startswith(PREFIX) else ref
+    if len(digest) != 64 or not all(c in '0123456789abcdef' for c in digest):
+        raise ValueError(f"Malformed blob reference: {ref}")
+    return digest
+
+def externalize(ir: Dict[str, Any], store: BlobStore, threshold: int = 64 * 1024) -> Dict[str, Any]:
+    """Move literal payloads of at least threshold bytes into store
+
+    Returns a copy of ir whose large "utf8:..." and buffer inputs are
+    replaced by blob references.
+    """
+    plan = []
+    for op in ir.get('plan', []):
+        op = dict(op)
+        inputs = {}
+        for key, value in op.get('in', {}).items():
+            if isinstance(value, str) and value.startswith('utf8:') and len(value) - 5 >= threshold:
+                value = store.put(value[5:])
+            elif isinstance(value, (bytes, bytearray, memoryview)) and len(value) >= threshold:
+                value = store.put(value)
+            inputs[key] = value
+        op['in'] = inputs
+        plan.append(op)
+    result = dict(ir)
+    result['plan'] = plan
+    return result
+
+_default_store = None
+
+def get_blob_store() -> Optional[BlobStore]:
+    """Shared store rooted at KRISPER_BLOB_DIR, or None if it is unset"""
+    global _default_store
+    root = os.environ.get('KRISPER_BLOB_DIR')
+    if not root:
+        return None
+    if _default_store is None or _default_store.root != root:
+        _default_store = BlobStore(root)
+    return _default_store
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+KRISPER Compile Cache - Content-addressed cache for compiled IR
+Bounded in-memory LRU with an optional on-disk tier shared between workers
+"""
+
+from __future__ import annotations
+
+import os
+import hashlib
+import threading
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Dict, Optional
+
+class TieredCache:
+    """In-memory LRU over an optional on-disk tier, keyed by hex digests
+
+    Entries are weighed by _weight against capacity (1 each by default).
+    With max_disk_bytes the disk tier is kept under that many bytes by
+    removing its least recently used files. Subclasses define how values
+    are written to and read from disk.
+    """
+
+    suffix = ''  # File name suffix of disk entries
+
+    def __init__(self, capacity: int, cache_dir: Optional[str] = None,
+                 max_disk_bytes: Optional[int] = None):
+        self.capacity = capacity
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_bytes = None  # Bytes under cache_dir, scanned on the first budgeted write
+        self._entries = {}  # key -> (value, weight), oldest first
+        self._lock = threading.Lock()
+        self.size = 0  # Total weight held in memory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _weight(self, value: Any) -> int:
+        return 1
+
+    def _encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def _decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Any:
+        """Look up a key in memory, then on disk (None if absent)"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[0]
+
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, value)
+        return value
+
+    def put(self, key: str, value: Any):
+        """Insert a value in memory and on disk; values over capacity are not kept"""
+        with self._lock:
+            kept = self._store(key, value)
+        if kept:
+            self._disk_put(key, value)
+
+    def clear(self):
+        """Drop all in-memory entries and reset counters (disk is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self._reset_counters()
+
+    def _reset_counters(self):
+        self.hits = self.misses = self.evictions = self.disk_hits = 0
+
+    def _store(self, key: str, value: Any) -> bool:
+        """Insert into the LRU, evicting the oldest entries (lock held)"""
+        weight = self._weight(value)
+        if weight > self.capacity:
+            return False
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self._entries[key] = (value, weight)
+        self.size += weight
+        while self.size > self.capacity:
+            self.size -= self._entries.pop(next(iter(self._entries)))[1]
+            self.evictions += 1
+        return True
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.suffix)
+
+    def _disk_get(self, key: str) -> Any:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = self._decode(f.read())
+            if self.max_disk_bytes is not None:
+                os.utime(path)  # Recently used files are pruned last
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, value: Any):
+        if not self.cache_dir:
+            return
+        data = self._encode(value)
+        budget = self.max_disk_bytes
+        if budget is not None and len(data) > budget:
+            return
+        import tempfile
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so concurrent workers never see partial entries
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError:
+                os.unlink(tmp)
+                raise
+        except OSError:
+            # The disk tier is best effort; the memory tier still holds the entry
+            return
+        if budget is not None:
+            with self._lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+                else:
+                    self._disk_bytes += len(data)
+                if self._disk_bytes > budget:
+                    self._prune_disk(budget)
+
+    def _disk_files(self):
+        """(mtime, size, path) of every disk entry"""
+        files = []
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith('.tmp'):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _prune_disk(self, budget: int):
+        """Remove least recently used disk entries until under budget (lock held)
+
+        The directory is rescanned, so entries written by other workers count too.
+        """
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+
+class CompileCache(TieredCache):
+    """Cache compiled IR documents by a hash of their normalized source"""
+
+    suffix = '.json'
+
+    def __init__(self, maxsize: int = 4096, cache_dir: Optional[str] = None):
+        super().__init__(maxsize, cache_dir)
+
+    @property
+    def maxsize(self) -> int:
+        return self.capacity
+
+    @staticmethod
+    def key(text: str, version: str) -> str:
+        """Content address of normalized source text for a compiler version"""
+        return hashlib.sha256(f"{version}\0{text}".encode('utf-8')).hexdigest()
+
+    def _encode(self, value: str) -> bytes:
+        return value.encode('utf-8')
+
+    def _decode(self, data: bytes) -> str:
+        return data.decode('utf-8')
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
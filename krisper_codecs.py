@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+KRISPER Codecs - Compression codec registry behind compress/decompress
+zlib, bz2 and lzma, plus an auto mode that picks a codec from a payload sample
+"""
+
+import time
+import zlib
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Non-zlib outputs start with FRAME_MAGIC and a codec id byte. A zlib stream's
+# first byte always has low nibble 8, so 'K' (0x4B) never starts one and
+# plain zlib output stays byte-for-byte what it was before codecs existed.
+FRAME_MAGIC = b'K'
+
+# Default throughput target for use="auto", in MB/s of input
+AUTO_TARGET_MBPS = 50.0
+AUTO_SAMPLE = 64 * 1024
+
+# Below this size use="auto" takes zlib's default level without sampling:
+# six trial compressions would cost more than any ratio they could win
+AUTO_MIN_BYTES = 4096
+
+# A cached auto choice is re-measured after this many uses, so it follows
+# the payloads a workload actually sends
+AUTO_RESAMPLE = 256
+
+class Codec:
+    """A named compressor with a one-byte id and a level range"""
+
+    def __init__(self, name: str, codec_id: int, compress: Callable[[Any, int], bytes],
+                 decompress: Callable[[Any], bytes], levels: range, default_level: int):
+        self.name = name
+        self.id = codec_id
+        self._compress = compress
+        self._decompress = decompress
+        self.levels = levels
+        self.default_level = default_level
+
+    def compress(self, data: Any, level: Optional[int] = None) -> bytes:
+        level = self.default_level if level is None else level
+        if level not in self.levels:
+            raise ValueError(f"{self.name} level must be in {self.levels.start}..{self.levels.stop - 1}, got {level}")
+        body = self._compress(data, level)
+        return body if self.id == 0 else FRAME_MAGIC + bytes((self.id,)) + body
+
+    def decompress(self, body: Any) -> bytes:
+        return self._decompress(body)
+
+CODECS = {}      # name -> Codec
+_BY_ID = {}      # id -> Codec
+_ALIASES = {'fibpi3d': 'zlib'}  # The compiler's default label
+
+def register_codec(codec: Codec):
+    """Add a codec; ids must be unique and fit in one byte"""
+    if codec.id in _BY_ID and _BY_ID[codec.id].name != codec.name:
+        raise ValueError(f"Codec id {codec.id} is taken by {_BY_ID[codec.id].name}")
+    CODECS[codec.name] = codec
+    _BY_ID[codec.id] = codec
+
+# bz2 and lzma are imported on first use to keep executor import cheap
+def _bz2_compress(data: Any, level: int) -> bytes:
+    import bz2
+    return bz2.compress(data, level)
+
+def _bz2_decompress(data: Any) -> bytes:
+    import bz2
+    return bz2.decompress(data)
+
+def _lzma_compress(data: Any, level: int) -> bytes:
+    import lzma
+    return lzma.compress(data, preset=level)
+
+def _lzma_decompress(data: Any) -> bytes:
+    import lzma
+    return lzma.decompress(data)
+
+register_codec(Codec('zlib', 0, lambda data, level: zlib.compress(data, level), zlib.decompress,
+                     range(-1, 10), 6))
+register_codec(Codec('bz2', 1, _bz2_compress, _bz2_decompress, range(1, 10), 9))
+register_codec(Codec('lzma', 2, _lzma_compress, _lzma_decompress, range(0, 10), 6))
+
+def get_codec(name: Optional[str]) -> Codec:
+    """Look up a codec by name (None and "fibpi3d" mean zlib)"""
+    name = _ALIASES.get(name, name) if name else 'zlib'
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec: {name}")
+    return CODECS[name]
+
+def codec_of(data: Any) -> Tuple[Codec, Any]:
+    """(codec, body) for compressed output, reading the frame if present"""
+    view = memoryview(data)
+    if len(view) >= 2 and view[:1] == FRAME_MAGIC:
+        codec = _BY_ID.get(view[1])
+        if codec is None:
+            raise ValueError(f"Unknown codec id: {view[1]}")
+        return codec, view[2:]
+    return CODECS['zlib'], data
+
+def compress(data: Any, params: Dict[str, Any], zdicts: Any = None) -> bytes:
+    """Compress per params: use (codec name or "auto"), level and dict
+
+    dict names a trained zlib preset dictionary in zdicts (a
+    krisper_zdict.ZDictStore, by default the shared store).
+    """
+    use = params.get('use')
+    if params.get('dict'):
+        if get_codec(use).name != 'zlib':
+            raise ValueError(f"Preset dictionaries need the zlib codec, not {use}")
+        level = params.get('level', CODECS['zlib'].default_level)
+        return _zdicts(zdicts).compress(data, params['dict'], level)
+    if use == 'auto':
+        codec, level = _auto_choice(data, params.get('target_mbps'), params.get('max_latency_ms'))
+        return codec.compress(data, level)
+    return get_codec(use).compress(data, params.get('level'))
+
+def decompress(data: Any, params: Optional[Dict[str, Any]] = None, zdicts: Any = None) -> bytes:
+    """Decompress with the codec recorded in data (and params['dict'] if set)"""
+    if params and params.get('dict'):
+        return _zdicts(zdicts).decompress(data, params['dict'])
+    codec, body = codec_of(data)
+    if (codec.name == 'zlib' and len(body) >= 2 and body[1] & 0x20
+            and body[0] & 0x0F == 8 and ((body[0] << 8) | body[1]) % 31 == 0):
+        # FDICT flag of a valid zlib header: zlib alone would only report "Error 2"
+        raise ValueError("Data was compressed with a preset dictionary; pass params.dict")
+    return codec.decompress(body)
+
+def _zdicts(zdicts: Any) -> Any:
+    if zdicts is None:
+        from krisper_zdict import get_zdict_store
+        zdicts = get_zdict_store()
+    return zdicts
+
+_auto_choices = {}  # (size bucket, target_mbps, max_latency_ms) -> [codec, level, uses left]
+
+def _auto_choice(data: Any, target_mbps: Optional[float],
+                 max_latency_ms: Optional[float]) -> Tuple[Codec, int]:
+    """choose_codec, cached per target and power-of-two size bucket"""
+    size = memoryview(data).nbytes
+    if size < AUTO_MIN_BYTES:
+        zlib_codec = CODECS['zlib']
+        return zlib_codec, zlib_codec.default_level
+    key = (size.bit_length(), target_mbps, max_latency_ms)
+    entry = _auto_choices.get(key)
+    if entry is None or entry[2] <= 0:
+        codec, level = choose_codec(data, target_mbps, max_latency_ms)
+        entry = _auto_choices[key] = [codec, level, AUTO_RESAMPLE]
+    entry[2] -= 1
+    return entry[0], entry[1]
+
+# (codec, level) pairs tried by auto mode, roughly fastest first
+AUTO_CANDIDATES = [('zlib', 1), ('zlib', 6), ('zlib', 9), ('bz2', 9), ('lzma', 1), ('lzma', 6)]
+
+def choose_codec(data: Any, target_mbps: Optional[float] = None,
+                 max_latency_ms: Optional[float] = None,
+                 candidates: Optional[List[Tuple[str, int]]] = None) -> Tuple[Codec, int]:
+    """Pick the best-ratio candidate whose projected speed meets the target
+
+    A sample from the start, middle and end of data is compressed with each
+    candidate. The required speed is max_latency_ms for the whole payload if
+    given, else target_mbps (default AUTO_TARGET_MBPS). If nothing is fast
+    enough, the fastest candidate wins.
+    """
+    view = memoryview(data).cast('B')
+    size = len(view)
+    if size <= AUTO_SAMPLE:
+        sample = bytes(view)
+    else:
+        third = AUTO_SAMPLE // 3
+        middle = (size - third) // 2
+        sample = b''.join((view[:third], view[middle:middle + third], view[size - third:]))
+    if max_latency_ms is not None:
+        required = size / (max_latency_ms / 1000.0) if max_latency_ms > 0 else float('inf')
+    else:
+        required = (target_mbps or AUTO_TARGET_MBPS) * 1e6
+
+    candidates = candidates or AUTO_CANDIDATES
+    for name in {name for name, _ in candidates}:
+        # Import lazily loaded codecs before timing so first use is not penalized
+        codec = CODECS[name]
+        codec.compress(b'', codec.levels.start)
+    best = fastest = None
+    for name, level in candidates:
+        codec = CODECS[name]
+        start = time.perf_counter()
+        compressed = len(codec.compress(sample, level))
+        speed = len(sample) / max(time.perf_counter() - start, 1e-9)
+        if fastest is None or speed > fastest[0]:
+            fastest = (speed, codec, level)
+        if speed >= required and (best is None or compressed < best[0]):
+            best = (compressed, codec, level)
+    _, codec, level = best or fastest
+    return codec, level
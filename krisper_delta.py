@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+KRISPER Delta - Ship plan updates to long-lived executors as patches
+Workers keep recent plans by hash; clients send edits against a known base
+"""
+
+import json
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return 'utf8:' + str(value, 'utf-8')
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+def op_digest(op: Dict[str, Any]) -> bytes:
+    """SHA-256 of an op's canonical JSON"""
+    text = json.dumps(op, sort_keys=True, separators=(',', ':'), default=_default)
+    return hashlib.sha256(text.encode('utf-8')).digest()
+
+def _combine(version: Any, digests: List[bytes]) -> str:
+    h = hashlib.sha256(str(version).encode('utf-8') + b'\0')
+    for digest in digests:
+        h.update(digest)
+    return h.hexdigest()
+
+def plan_hash(ir: Dict[str, Any]) -> str:
+    """Content hash of a plan, built from per-op digests so patches rehash only what changed"""
+    return _combine(ir.get('version', ''), [op_digest(op) for op in ir.get('plan', [])])
+
+def make_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe new as edits against old
+
+    Edits apply in order and are one of
+      {"edit": "payload", "alias": X, "key": K, "value": V}  set input K of the op defining X
+      {"edit": "replace", "index": i, "op": {...}}
+      {"edit": "insert", "index": i, "op": {...}}
+      {"edit": "delete", "index": i}
+    Indices refer to the plan as left by the preceding edits.
+    """
+    a, b = old.get('plan', []), new.get('plan', [])
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < min(len(a), len(b)) - prefix
+           and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]):
+        suffix += 1
+
+    edits = []
+    middle_a, middle_b = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    for offset in range(min(len(middle_a), len(middle_b))):
+        before, after = middle_a[offset], middle_b[offset]
+        if before == after:
+            continue
+        # The alias must name a single op in the plan as it stands at this edit
+        current = b[:prefix + offset] + a[prefix + offset:]
+        key = _payload_swap(before, after, current)
+        if key is not None:
+            edits.append({'edit': 'payload', 'alias': after['out'], 'key': key, 'value': after['in'][key]})
+        else:
+            edits.append({'edit': 'replace', 'index': prefix + offset, 'op': after})
+    shared = min(len(middle_a), len(middle_b))
+    for offset in range(shared, len(middle_b)):
+        edits.append({'edit': 'insert', 'index': prefix + offset, 'op': middle_b[offset]})
+    for _ in range(shared, len(middle_a)):
+        edits.append({'edit': 'delete', 'index': prefix + shared})
+
+    delta = {'base': plan_hash(old), 'target': plan_hash(new), 'edits': edits}
+    if new.get('version') != old.get('version'):
+        delta['version'] = new.get('version')
+    return delta
+
+def _payload_swap(before: Dict[str, Any], after: Dict[str, Any], plan: List[Dict[str, Any]]) -> Optional[str]:
+    """The one literal input that differs between two otherwise equal ops, if any"""
+    out = before.get('out')
+    if not out or after.get('out') != out or sum(op.get('out') == out for op in plan) != 1:
+        return None
+    if {k: v for k, v in before.items() if k != 'in'} != {k: v for k, v in after.items() if k != 'in'}:
+        return None
+    old_in, new_in = before.get('in', {}), after.get('in', {})
+    if old_in.keys() != new_in.keys():
+        return None
+    changed = [key for key in old_in if old_in[key] != new_in[key]]
+    if len(changed) == 1 and all(isinstance(v, str) and v.startswith(('utf8:', 'blob:'))
+                                 for v in (old_in[changed[0]], new_in[changed[0]])):
+        return changed[0]
+    return None
+
+def is_delta(message: Any) -> bool:
+    return isinstance(message, dict) and 'base' in message and 'edits' in message
+
+class PlanCache:
+    """Worker-side LRU of plans by hash, able to apply deltas against them"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries = {}  # hash -> (ir, per-op digests), oldest first
+        self._lock = threading.Lock()
+
+    def put(self, ir: Dict[str, Any]) -> str:
+        """Remember a full plan and return its hash"""
+        digests = [op_digest(op) for op in ir.get('plan', [])]
+        key = _combine(ir.get('version', ''), digests)
+        self._store(key, ir, digests)
+        return key
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            return entry[0]
+
+    def load(self, message: Any) -> Tuple[str, Dict[str, Any]]:
+        """Accept a full plan (dict or JSON) or a delta; return (hash, plan)
+
+        Raises KeyError if a delta's base is not cached (the client should
+        resend the full plan) and ValueError if base, target or an edit is
+        malformed, an edit is out of range, or the result does not match the
+        delta's target hash.
+        """
+        if isinstance(message, str):
+            message = json.loads(message)
+        if not is_delta(message):
+            return self.put(message), message
+        return self.apply(message)
+
+    def apply(self, delta: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Patch a cached plan; only edited ops are copied and rehashed"""
+        for name in ('base', 'target'):
+            if name in delta and not isinstance(delta[name], str):
+                raise ValueError(f"Delta {name} must be a plan hash string")
+        with self._lock:
+            entry = self._entries.get(delta['base'])
+        if entry is None:
+            raise KeyError(f"Unknown base plan: {delta['base']}")
+        base, digests = entry
+        plan, digests = list(base.get('plan', [])), list(digests)
+        edits = delta['edits']
+        if not isinstance(edits, list):
+            raise ValueError("Delta edits must be a list")
+        for number, edit in enumerate(edits):
+            kind = edit.get('edit') if isinstance(edit, dict) else None
+            if kind == 'payload':
+                alias, key = _field(edit, 'alias', str, number), _field(edit, 'key', str, number)
+                index = _defining_op(plan, alias)
+                op = dict(plan[index])
+                op['in'] = dict(op.get('in', {}), **{key: _field(edit, 'value', object, number)})
+                plan[index], digests[index] = op, op_digest(op)
+            elif kind == 'replace':
+                index, op = _edit_index(edit, len(plan), number), _field(edit, 'op', dict, number)
+                plan[index], digests[index] = op, op_digest(op)
+            elif kind == 'insert':
+                index, op = _edit_index(edit, len(plan) + 1, number), _field(edit, 'op', dict, number)
+                plan.insert(index, op)
+                digests.insert(index, op_digest(op))
+            elif kind == 'delete':
+                index = _edit_index(edit, len(plan), number)
+                del plan[index], digests[index]
+            else:
+                raise ValueError(f"Unknown delta edit: {kind}")
+
+        ir = dict(base)
+        if 'version' in delta:
+            ir['version'] = delta['version']
+        ir['plan'] = plan
+        key = _combine(ir.get('version', ''), digests)
+        if key != delta.get('target', key):
+            raise ValueError(f"Delta produced {key}, expected {delta['target']}")
+        self._store(key, ir, digests)
+        return key, ir
+
+    def _store(self, key: str, ir: Dict[str, Any], digests: List[bytes]):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (ir, digests)
+            while len(self._entries) > self.maxsize:
+                del self._entries[next(iter(self._entries))]
+
+def _field(edit: Dict[str, Any], name: str, kind: type, number: int) -> Any:
+    """edit[name], checked to be a kind (bool is never an index)"""
+    value = edit.get(name)
+    if name not in edit or not isinstance(value, kind):
+        raise ValueError(f"Delta edit {number} ({edit['edit']}): {name!r} must be {kind.__name__}")
+    return value
+
+def _edit_index(edit: Dict[str, Any], limit: int, number: int) -> int:
+    """edit['index'], checked to lie in range(limit)"""
+    index = _field(edit, 'index', int, number)
+    if isinstance(index, bool) or not 0 <= index < limit:
+        raise ValueError(f"Delta edit {number} ({edit['edit']}): index {index!r} out of range")
+    return index
+
+def _defining_op(plan: List[Dict[str, Any]], alias: str) -> int:
+    for index, op in enumerate(plan):
+        if op.get('out') == alias:
+            return index
+    raise ValueError(f"No op defines {alias}")
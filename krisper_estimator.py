@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+KRISPER Estimator - Static cost and memory estimates for IR plans
+Predicts CPU time, peak memory and output size before a plan is executed
+"""
+
+import os
+import json
+import time
+import zlib
+import base64
+import hashlib
+import random
+from typing import Dict, Any, Optional, Tuple
+from krisper_binary import decode_ir, is_binary_ir
+from krisper_blobs import BlobStore, get_blob_store, is_blob_ref
+from krisper_values import Base64Value
+from krisper_codecs import CODECS, AUTO_CANDIDATES, AUTO_MIN_BYTES, AUTO_TARGET_MBPS, get_codec
+
+# Defaults measured on mixed English-like text; run CostModel.calibrate() locally
+_DEFAULT_COMPRESS_NS = {0: 0.6, 1: 10.0, 2: 16.0, 3: 23.0, 4: 22.0, 5: 47.0,
+                        6: 69.0, 7: 75.0, 8: 71.0, 9: 72.0}
+_DEFAULT_RATIO = {0: 1.0, 1: 0.34, 2: 0.34, 3: 0.33, 4: 0.32, 5: 0.31,
+                  6: 0.30, 7: 0.30, 8: 0.30, 9: 0.30}
+# Other codecs, per level: compress ns per input byte, ratio, and decompress
+# ns per decompressed byte (same text as above)
+_DEFAULT_CODECS = {
+    'bz2': {
+        'compress_ns': {1: 90.0, 2: 92.0, 3: 96.0, 4: 102.0, 5: 82.0, 6: 90.0, 7: 87.0, 8: 98.0, 9: 112.0},
+        'ratio': {1: 0.22, 2: 0.205, 3: 0.2, 4: 0.196, 5: 0.195, 6: 0.192, 7: 0.192, 8: 0.193, 9: 0.192},
+        'decompress_ns': 40.0,
+    },
+    'lzma': {
+        'compress_ns': {0: 82.0, 1: 95.0, 2: 150.0, 3: 234.0, 4: 527.0, 5: 661.0, 6: 610.0,
+                        7: 639.0, 8: 665.0, 9: 652.0},
+        'ratio': {0: 0.321, 1: 0.308, 2: 0.311, 3: 0.308, 4: 0.267, 5: 0.263, 6: 0.263,
+                  7: 0.263, 8: 0.263, 9: 0.263},
+        'decompress_ns': 20.0,
+    },
+}
+
+_DEFAULT_NS = {
+    'decompress': 4.8,  # per decompressed byte
+    'hash': 0.8,
+    'b64encode': 2.2,
+    'b64decode': 4.0,   # per base64 byte
+    'utf8': 0.1,        # str <-> bytes conversion
+    'compare': 0.05,
+}
+
+def _b64_size(n: int) -> int:
+    return 4 * ((n + 2) // 3)
+
+def _utf8_size(value: str) -> int:
+    return len(value) if value.isascii() else len(value.encode('utf-8'))
+
+class CostModel:
+    """Per-op cost coefficients (nanoseconds per byte) and compression ratios
+
+    compress_ns and ratio are zlib's, by level; codecs holds the same
+    tables (plus decompress_ns) for the other registered codecs.
+    """
+
+    def __init__(self, compress_ns: Optional[Dict[int, float]] = None,
+                 ratio: Optional[Dict[int, float]] = None,
+                 ns: Optional[Dict[str, float]] = None,
+                 op_overhead_s: float = 5e-6,
+                 codecs: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.compress_ns = dict(compress_ns or _DEFAULT_COMPRESS_NS)
+        self.ratio = dict(ratio or _DEFAULT_RATIO)
+        self.ns = dict(_DEFAULT_NS, **(ns or {}))
+        self.op_overhead_s = op_overhead_s
+        self.codecs = dict(_DEFAULT_CODECS, **(codecs or {}))
+
+    def compress_cost(self, codec: str, level: Optional[int] = None) -> Tuple[float, float]:
+        """(ns per input byte, ratio) for compressing with codec at level"""
+        if level is None:
+            level = CODECS[codec].default_level if codec in CODECS else 6
+        costs = self.codecs.get(codec)
+        if costs is None:
+            return self.compress_ns.get(level, self.compress_ns[6]), self.ratio.get(level, self.ratio[6])
+        default = CODECS[codec].default_level
+        return (costs['compress_ns'].get(level, costs['compress_ns'][default]),
+                costs['ratio'].get(level, costs['ratio'][default]))
+
+    def decompress_ns(self, codec: Optional[str]) -> float:
+        """ns per decompressed byte for codec (zlib if unknown)"""
+        costs = self.codecs.get(codec)
+        return self.ns['decompress'] if costs is None else costs['decompress_ns']
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'compress_ns': self.compress_ns,
+            'ratio': self.ratio,
+            'ns': self.ns,
+            'op_overhead_s': self.op_overhead_s,
+            'codecs': self.codecs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CostModel':
+        """Load a model saved with to_dict (JSON turns level keys into strings)"""
+        return cls(
+            compress_ns={int(k): v for k, v in data['compress_ns'].items()},
+            ratio={int(k): v for k, v in data['ratio'].items()},
+            ns=data['ns'],
+            op_overhead_s=data['op_overhead_s'],
+            codecs={name: {'compress_ns': {int(k): v for k, v in costs['compress_ns'].items()},
+                           'ratio': {int(k): v for k, v in costs['ratio'].items()},
+                           'decompress_ns': costs['decompress_ns']}
+                    for name, costs in data.get('codecs', {}).items()},
+        )
+
+    @classmethod
+    def calibrate(cls, sample: Optional[bytes] = None, size: int = 1 << 20,
+                  repeats: int = 3) -> 'CostModel':
+        """Fit the model from a local benchmark over sample (or synthetic text)"""
+        if sample is None:
+            rng = random.Random(313)
+            words = [''.join(rng.choice('etaoinshrdlu') for _ in range(rng.randint(2, 9)))
+                     for _ in range(500)]
+            sample = ' '.join(rng.choice(words) for _ in range(size // 5)).encode('ascii')
+        data = sample[:size] or b'\0'
+        n = len(data)
+
+        def best_ns(fn, per: int) -> float:
+            best = float('inf')
+            for _ in range(repeats):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            return best * 1e9 / per
+
+        compress_ns, ratio = {}, {}
+        for level in range(10):
+            compress_ns[level] = best_ns(lambda: zlib.compress(data, level), n)
+            ratio[level] = len(zlib.compress(data, level)) / n
+        codecs = {}
+        for name in _DEFAULT_CODECS:
+            codec = CODECS[name]
+            costs = codecs[name] = {'compress_ns': {}, 'ratio': {}}
+            for level in codec.levels:
+                costs['compress_ns'][level] = best_ns(lambda: codec.compress(data, level), n)
+                costs['ratio'][level] = len(codec.compress(data, level)) / n
+            packed = codec.compress(data)[2:]
+            costs['decompress_ns'] = best_ns(lambda: codec.decompress(packed), n)
+        compressed = zlib.compress(data, 6)
+        encoded = base64.b64encode(data)
+        text = data.decode('utf-8', errors='replace')
+        ns = {
+            'decompress': best_ns(lambda: zlib.decompress(compressed), n),
+            'hash': best_ns(lambda: hashlib.sha256(data).digest(), n),
+            'b64encode': best_ns(lambda: base64.b64encode(data), n),
+            'b64decode': best_ns(lambda: base64.b64decode(encoded), len(encoded)),
+            'utf8': best_ns(lambda: text.encode('utf-8'), n),
+            'compare': best_ns(lambda: text == text[:-1] + text[-1:], n),
+        }
+        return cls(compress_ns, ratio, ns, codecs=codecs)
+
+class _Value:
+    """Size facts about a value flowing through the plan"""
+
+    def __init__(self, size: int, is_text: bool = True, raw_size: Optional[int] = None,
+                 known: bool = True, b64: bool = False, codec: Optional[str] = None):
+        self.size = size          # Bytes held by the value
+        self.is_text = is_text    # Stored as str (ops re-encode it to bytes)
+        self.raw_size = raw_size  # For compress outputs: the original payload size
+        self.known = known
+        self.b64 = b64            # Held as a Base64Value: text ops see its base64 form
+        self.codec = codec        # For compress outputs: the codec that made them
+
+    @property
+    def public_size(self) -> int:
+        """Size once rendered into results['outputs']"""
+        return _b64_size(self.size) if self.b64 else self.size
+
+def estimate(ir: Dict[str, Any], model: Optional[CostModel] = None,
+             variables: Optional[Dict[str, Any]] = None,
+             blob_store: Optional[BlobStore] = None) -> Dict[str, Any]:
+    """Estimate CPU time, peak memory and output size per op and for the plan
+
+    variables gives values already held by the executor (e.g.
+    executor.variables) so references to them can be sized; blob references
+    are sized from blob_store. Any other reference is counted as unknown.
+    """
+    if isinstance(ir, str):
+        ir = json.loads(ir)
+    elif is_binary_ir(ir):
+        ir = decode_ir(ir)
+    model = model or CostModel()
+    blob_store = blob_store or get_blob_store()
+    env = {}
+    if variables:
+        for name, value in variables.items():
+            env[name] = _size_of(value)
+
+    ops = []
+    resident = 0  # Native outputs kept by the executor so far
+    defined = set()
+    unknown = []
+    total_cpu = 0.0
+    peak = 0
+    for op in ir.get('plan', []):
+        inputs = {}
+        for key, value in op.get('in', {}).items():
+            if is_blob_ref(value):
+                if blob_store is not None and value in blob_store:
+                    # Mapped, so it costs address space rather than resident copies
+                    inputs[key] = _Value(blob_store.size(value), is_text=False)
+                    continue
+                unknown.append(value)
+            elif isinstance(value, str) and value.startswith('file:'):
+                if os.path.isfile(value[5:]):
+                    inputs[key] = _Value(os.path.getsize(value[5:]), is_text=False)
+                    continue
+                unknown.append(value)
+            elif isinstance(value, str) and not value.startswith('utf8:') and value not in env:
+                unknown.append(value)
+            inputs[key] = _resolve(value, env)
+        cpu_ns, transient, out = _estimate_op(op['op'], inputs, op.get('params', {}), model)
+        cpu = model.op_overhead_s + cpu_ns / 1e9
+        op_peak = resident + transient + out.size
+        if op.get('out'):
+            if op['out'] in defined:
+                resident -= env[op['out']].size
+            defined.add(op['out'])
+            env[op['out']] = out
+            resident += out.size
+        total_cpu += cpu
+        peak = max(peak, op_peak)
+        ops.append({
+            'op': op['op'],
+            'out': op.get('out'),
+            'cpu_seconds': cpu,
+            'peak_bytes': op_peak,
+            'output_bytes': out.public_size,
+        })
+
+    # Outputs are rendered to text once, after the last op
+    rendered = sum(env[name].public_size for name in defined)
+    peak = max(peak, resident + sum(env[name].public_size for name in defined if env[name].b64))
+    return {
+        'ops': ops,
+        'total': {
+            'cpu_seconds': total_cpu,
+            'peak_bytes': peak,
+            'output_bytes': rendered,
+        },
+        'unknown_inputs': unknown,
+    }
+
+def _size_of(value: Any) -> _Value:
+    if isinstance(value, Base64Value):
+        return _Value(memoryview(value.raw).nbytes, is_text=False, b64=True)
+    if isinstance(value, str):
+        return _Value(_utf8_size(value))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _Value(memoryview(value).nbytes, is_text=False)
+    return _Value(8, is_text=False)
+
+def _resolve(value: Any, env: Dict[str, _Value]) -> _Value:
+    """Mirror KrisperExecutor._resolve_inputs for sizes"""
+    if isinstance(value, str):
+        if value.startswith('utf8:'):
+            return _Value(_utf8_size(value) - 5)
+        if value in env:
+            return env[value]
+        return _Value(_utf8_size(value), known=False)
+    return _size_of(value)
+
+def _codec_for(params: Dict[str, Any], n: int, model: CostModel) -> Tuple[str, Optional[int]]:
+    """(codec name, level) a compress op will use, modelling use="auto" like
+    krisper_codecs: the best modelled ratio that meets the speed target"""
+    use = params.get('use')
+    level = params.get('level')
+    if params.get('dict'):
+        return 'zlib', level
+    if use != 'auto':
+        try:
+            return get_codec(use).name, level
+        except ValueError:
+            return 'zlib', level  # Unknown codecs fail in the executor before any work
+    if n < AUTO_MIN_BYTES:
+        return 'zlib', None
+    if params.get('max_latency_ms') is not None:
+        latency = params['max_latency_ms']
+        allowed = latency * 1e6 / n if latency > 0 else 0.0
+    else:
+        allowed = 1000.0 / (params.get('target_mbps') or AUTO_TARGET_MBPS)
+    options = [(model.compress_cost(name, lvl), name, lvl) for name, lvl in AUTO_CANDIDATES]
+    fitting = [option for option in options if option[0][0] <= allowed]
+    if fitting:
+        _, name, lvl = min(fitting, key=lambda option: option[0][1])
+    else:
+        _, name, lvl = min(options, key=lambda option: option[0][0])
+    return name, lvl
+
+def _estimate_op(name: str, inputs: Dict[str, _Value], params: Dict[str, Any],
+                 model: CostModel):
+    """Return (cpu ns, transient bytes, output value) for one op"""
+    ns = model.ns
+    empty = _Value(0)
+
+    def as_bytes(value: _Value):
+        """(cpu ns, transient bytes, byte size) to view value as bytes, like krisper_values.as_bytes"""
+        if value.b64:
+            size = _b64_size(value.size)
+            return value.size * ns['b64encode'], size, size
+        if value.is_text:
+            return value.size * ns['utf8'], value.size, value.size
+        return 0.0, 0, value.size
+
+    def raw_of(value: _Value):
+        """(cpu ns, transient bytes, byte size) of the binary behind base64 data"""
+        if value.b64:
+            return 0.0, 0, value.size
+        size = value.size * 3 // 4
+        return value.size * ns['b64decode'], size, size
+
+    if name == 'compress':
+        cpu, transient, n = as_bytes(inputs.get('payload', empty))
+        codec, level = _codec_for(params, n, model)
+        per_byte, ratio = model.compress_cost(codec, level)
+        compressed = int(n * ratio) + 11
+        cpu += n * per_byte
+        return cpu, transient, _Value(compressed, is_text=False, raw_size=n, b64=True, codec=codec)
+    if name == 'decompress':
+        data = inputs.get('data', empty)
+        cpu, transient, compressed = raw_of(data)
+        raw = data.raw_size
+        if raw is None:
+            raw = int(compressed / model.compress_cost(data.codec or 'zlib')[1])
+        cpu += raw * (model.decompress_ns(data.codec) + ns['utf8'])
+        return cpu, transient + raw, _Value(raw)
+    if name == 'hash':
+        cpu, transient, n = as_bytes(inputs.get('data', empty))
+        return cpu + n * ns['hash'], transient, _Value(64)
+    if name == 'encode':
+        # The input bytes become the value; base64 text is only made for outputs
+        data = inputs.get('data', empty)
+        cpu, _, n = as_bytes(data)
+        return cpu, 0, _Value(n, is_text=False, b64=True)
+    if name == 'decode':
+        cpu, transient, n = raw_of(inputs.get('data', empty))
+        return cpu + n * ns['utf8'], transient + n, _Value(n)
+    if name == 'compare':
+        a = inputs.get('a', inputs.get('left', empty))
+        b = inputs.get('b', inputs.get('right', empty))
+        return min(a.size, b.size) * ns['compare'], 0, _Value(0, is_text=False)
+    if name in ('compress_stream', 'decompress_stream'):
+        # Only one chunk in and one out are held at a time
+        data = inputs.get('source', empty)
+        chunk = params.get('chunk_size', 1 << 16)
+        cpu, _, n = as_bytes(data)
+        if name == 'compress_stream':
+            level = params.get('level', 6)
+            cpu += n * model.compress_ns.get(level, model.compress_ns[6])
+        else:
+            cpu += n / model.ratio[6] * ns['decompress']
+        return cpu, 2 * min(chunk, max(n, 1)), _Value(0, is_text=False)
+    if name == 'copy':
+        return 0.0, 0, inputs.get('value', empty)
+    if name == 'load':
+        # A mapping: pages are read on demand, nothing is copied up front
+        path = inputs.get('path', empty)
+        return 0.0, 0, _Value(path.size, is_text=False, known=path.known)
+    # Unknown ops fail in the executor before doing any work
+    return 0.0, 0, _Value(0, known=False)
@@ -4,17 +4,157 @@ KRISPER Executor - Executes KRISPER IR
 Turns intermediate representation into real actions
 """
 
+import os
 import json
+import mmap
 import zlib
 import base64
 import hashlib
-from typing import Dict, Any, Optional
+from itertools import islice
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+from krisper_binary import decode_ir
+from krisper_blobs import BlobStore, get_blob_store
+from krisper_validator import validate_ir
+from krisper_delta import PlanCache
+from krisper_values import Base64Value, FileRef, as_bytes, public
+from krisper_vm import Program, compile_plan
+from krisper_memo import ResultCache
+import krisper_codecs as codecs
+
+# Input slice size for fused compress chains
+FUSION_CHUNK = 1 << 20
+
+# Default read/write size for the streaming ops
+STREAM_CHUNK = 1 << 16
+
+# Slice size for comparing mapped buffers; memoryview == memoryview compares
+# item by item, while bytes slices of this size compare with memcmp in cache
+COMPARE_CHUNK = 1 << 18
+
+# Records run together per column sweep in execute_batch
+BATCH_CHUNK = 256
+
+# Compress params.use values that select plain zlib, the only fusable codec
+_ZLIB_NAMES = (None, 'zlib', 'fibpi3d')
+
+# Ops with side effects. The parallel scheduler treats each as a barrier: it
+# runs after every earlier op and before every later one, so file reads
+# (load, stream sources) see the files written before them in the plan
+_ORDERED_OPS = {'compress_stream', 'decompress_stream'}
+
+def _iter_chunks(source: Any, size: int) -> Iterator[bytes]:
+    """Return an iterator over source in chunks of at most size bytes
+    
+    source is a FileRef, a str or buffer, or an iterable of str/bytes
+    chunks (iterables are passed through chunk by chunk). Any other str is
+    data, even if it starts with "file:". Files are opened and iterables
+    checked here, not on first iteration, so a bad source fails the op that
+    was given it.
+    """
+    if isinstance(source, Base64Value):
+        source = source.ascii()
+    if isinstance(source, FileRef):
+        return _read_chunks(open(source.path, 'rb'), size)
+    if isinstance(source, str):
+        return (source[start:start + size].encode('utf-8') for start in range(0, len(source), size))
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        return (view[start:start + size] for start in range(0, len(view), size))
+    return (chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in iter(source))
+
+def _read_chunks(f: Any, size: int) -> Iterator[bytes]:
+    with f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+def _buffers_equal(a: Any, b: Any) -> bool:
+    """Byte equality of two buffers, sliced so large mappings compare at memcmp speed"""
+    a, b = memoryview(a).cast('B'), memoryview(b).cast('B')
+    if len(a) != len(b):
+        return False
+    for start in range(0, len(a), COMPARE_CHUNK):
+        end = start + COMPARE_CHUNK
+        if a[start:end].tobytes() != b[start:end].tobytes():
+            return False
+    return True
+
+def _dependencies(plan: List[Dict[str, Any]], ordered: Iterable[str]) -> Tuple[List[Dict[str, int]], List[set]]:
+    """Def-use graph of a plan: per op, {input name: producing op index} and
+    the set of ops it must wait for
+    
+    An ordered op waits for every earlier op and every later op waits for
+    the latest ordered op before it (earlier ones are reached through it).
+    """
+    refs, needs = [], []
+    last_def = {}
+    barrier = None
+    for index, op in enumerate(plan):
+        uses = {value: last_def[value] for value in op.get('in', {}).values()
+                if isinstance(value, str) and value in last_def}
+        refs.append(uses)
+        if op.get('op') in ordered:
+            needs.append(set(range(barrier or 0, index)))
+            barrier = index
+        else:
+            needs.append(set(uses.values()) if barrier is None else set(uses.values()) | {barrier})
+        if op.get('out'):
+            last_def[op['out']] = index
+    return refs, needs
+
+def _sink(chunks: Iterator[bytes], dest: Any, stats: Dict[str, int]) -> Any:
+    """Write chunks to a FileRef dest, or hand them back as an iterator"""
+    if dest is None:
+        return chunks
+    if not isinstance(dest, FileRef):
+        raise ValueError(f"Stream dest must be a file: reference, got {dest!r}")
+    with open(dest.path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return dict(stats, path=dest.path)
+
+class _Base64Stream:
+    """Incremental base64 encoder that carries the 0-2 byte remainder"""
+    
+    def __init__(self):
+        self.pending = b''
+    
+    def feed(self, data: bytes) -> Tuple[bytes, ...]:
+        """Encode what can be encoded so far, as one or two chunks"""
+        view = memoryview(data)
+        head = ()
+        if self.pending:
+            need = 3 - len(self.pending)
+            if len(view) < need:
+                self.pending += bytes(view)
+                return ()
+            head = (base64.b64encode(self.pending + bytes(view[:need])),)
+            view = view[need:]
+        cut = len(view) - len(view) % 3
+        self.pending = bytes(view[cut:])
+        return head + (base64.b64encode(view[:cut]),)
+    
+    def flush(self) -> Tuple[bytes, ...]:
+        out, self.pending = base64.b64encode(self.pending), b''
+        return (out,)
 
 class KrisperExecutor:
     """Execute KRISPER intermediate representation"""
     
-    def __init__(self):
+    _validator = staticmethod(validate_ir)
+    
+    def __init__(self, blob_store: Optional[BlobStore] = None, plan_cache: Optional[PlanCache] = None,
+                 workers: Optional[int] = None, result_cache: Optional[ResultCache] = None,
+                 zdict_store: Optional[Any] = None):
         self.variables = {}
+        self.blob_store = blob_store
+        self.plan_cache = plan_cache
+        self.workers = workers  # Thread pool size for independent ops; None runs in order
+        self._pool = None
+        self.result_cache = result_cache  # Memoizes pure op results; disables fusion
+        self.zdict_store = zdict_store    # Preset dictionaries for the `dict` param (default: shared store)
         self.operations = {
             'compress': self._op_compress,
             'decompress': self._op_decompress,
@@ -22,55 +162,353 @@ class KrisperExecutor:
             'hash': self._op_hash,
             'encode': self._op_encode,
             'decode': self._op_decode,
+            'copy': self._op_copy,
+            'load': self._op_load,
+            'compress_stream': self._op_compress_stream,
+            'decompress_stream': self._op_decompress_stream,
         }
     
-    def execute(self, ir: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a KRISPER IR plan"""
-        if isinstance(ir, str):
-            ir = json.loads(ir)
-            
+    def execute(self, ir: Dict[str, Any], validate: bool = False,
+                outputs: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Execute a KRISPER IR plan (dict, JSON text or binary IR)
+        
+        With validate=True the whole plan is checked first and a malformed
+        plan is rejected before any op runs. With a plan_cache, ir may also be
+        a delta against a plan this executor has already seen.
+        
+        Values stay native (bytes, Base64Value) in self.variables; only the
+        outputs returned in results['outputs'] (all by default, or the names
+        in outputs) are converted to their text form, once, at the end.
+        """
         results = {
             'success': True,
             'outputs': {},
             'log': []
         }
+        ir = self._prepare(ir, results, validate)
+        if ir is None:
+            return results
+        
+        plan = ir.get('plan', [])
+        if self.workers and self.workers > 1 and len(plan) > 1:
+            produced = self._run_parallel(plan, results)
+        else:
+            produced = self._run_sequential(plan, results)
+        
+        wanted = produced.keys() if outputs is None else set(outputs)
+        results['outputs'] = {name: public(value) for name, value in produced.items() if name in wanted}
+        return results
+    
+    def _prepare(self, ir: Any, results: Dict[str, Any], validate: bool) -> Optional[Dict[str, Any]]:
+        """Decode ir, apply plan_cache deltas and validate; None if rejected"""
+        if isinstance(ir, str):
+            ir = json.loads(ir)
+        elif isinstance(ir, (bytes, bytearray, memoryview)):
+            # Binary IR payloads stay memoryviews into the caller's buffer
+            ir = decode_ir(ir)
+        
+        if self.plan_cache is not None:
+            # Deltas patch a plan sent earlier; full plans become future bases
+            try:
+                results['plan_hash'], ir = self.plan_cache.load(ir)
+            except (KeyError, ValueError) as e:
+                results['success'] = False
+                message = e.args[0] if isinstance(e, KeyError) else str(e)
+                results['log'].append(f"✗ delta: {message}")
+                return None
+        
+        if validate:
+            errors = self._validator(ir, self.variables)
+            if errors:
+                results['success'] = False
+                results['log'].extend(f"✗ {error}" for error in errors)
+                return None
+        return ir
+    
+    def _run_sequential(self, plan: List[Dict[str, Any]], results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run ops in plan order, fusing compress chains; return {out: value}"""
+        # Fused chains bypass _execute_op, so they would never hit the result cache
+        fusions = self._find_fusions(plan) if self.result_cache is None else {}
+        fused = {}
+        produced = {}
         
         # Execute each operation in the plan
-        for op in ir.get('plan', []):
+        for index, op in enumerate(plan):
             try:
-                result = self._execute_op(op)
+                if index in fused:
+                    # Already produced by the fused chain it belongs to
+                    result = fused.pop(index)
+                elif index in fusions:
+                    fused.update(self._run_fused(plan, index, fusions[index]))
+                    result = fused.pop(index)
+                else:
+                    result = self._execute_op(op)
                 if op.get('out'):
                     self.variables[op['out']] = result
-                    results['outputs'][op['out']] = result
+                    produced[op['out']] = result
                 results['log'].append(f"✓ {op['op']} → {op.get('out', 'void')}")
             except Exception as e:
                 results['success'] = False
                 results['log'].append(f"✗ {op['op']}: {str(e)}")
                 break
-                
+        return produced
+    
+    def _run_parallel(self, plan: List[Dict[str, Any]], results: Dict[str, Any]) -> Dict[str, Any]:
+        """Run ops as their inputs become ready on the thread pool
+        
+        Each op reads the values of the ops that last defined its inputs
+        before it in the plan, so later redefinitions cannot race it.
+        Results are committed in plan order up to the first failure, giving
+        the same outputs, variables and log as sequential mode; ops past a
+        failure may run but are discarded. Side-effecting ops wait for every
+        earlier op to succeed, and later ops wait for them, so a load sees a
+        file written earlier in the plan.
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        if self._pool is None or self._pool._max_workers != self.workers:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='krisper')
+        
+        refs, needs = _dependencies(plan, _ORDERED_OPS)
+        remaining = [len(deps) for deps in needs]  # op index -> number of unfinished dependencies
+        dependents = [[] for _ in plan]
+        for index, deps in enumerate(needs):
+            for dep in deps:
+                dependents[dep].append(index)
+        ready = [index for index, deps in enumerate(needs) if not deps]
+        
+        outcome = {}  # op index -> (succeeded, value or exception)
+        running = {}
+        failed_at = len(plan)
+        while ready or running:
+            for index in ready:
+                if index < failed_at:
+                    bindings = {name: outcome[dep][1] for name, dep in refs[index].items()}
+                    running[self._pool.submit(self._execute_op, plan[index], bindings)] = index
+            ready = []
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    outcome[index] = (True, future.result())
+                except Exception as e:
+                    outcome[index] = (False, e)
+                    failed_at = min(failed_at, index)
+                    continue
+                for child in dependents[index]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        ready.append(child)
+        
+        produced = {}
+        for index, op in enumerate(plan):
+            ok, value = outcome[index]
+            if not ok:
+                results['success'] = False
+                results['log'].append(f"✗ {op['op']}: {str(value)}")
+                break
+            if op.get('out'):
+                self.variables[op['out']] = value
+                produced[op['out']] = value
+            results['log'].append(f"✓ {op['op']} → {op.get('out', 'void')}")
+        return produced
+    
+    def compile(self, ir: Dict[str, Any], inputs: Iterable[str] = ()) -> Program:
+        """Compile a plan once for repeated runs (see krisper_vm.compile_plan)"""
+        return compile_plan(ir, self, inputs)
+    
+    def execute_batch(self, ir: Dict[str, Any], bindings: Iterable[Dict[str, Any]],
+                      validate: bool = False, outputs: Optional[Iterable[str]] = None,
+                      chunk_size: int = BATCH_CHUNK,
+                      inputs: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Run one plan per binding dict, yielding results in input order
+        
+        The plan is compiled once and run column-wise over chunks of
+        chunk_size records, so bindings may be an unbounded stream. Its
+        inputs are the names given in inputs, or by default every bare name
+        the plan reads that no earlier op defines and self.variables does not
+        hold; each record must bind all of them. Each result is {'success',
+        'outputs', 'log'}; the log holds only a failing record's error line.
+        Records do not write self.variables. An invalid plan raises
+        ValueError before any record runs.
+        """
+        records = iter(bindings)
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        if isinstance(ir, str):
+            ir = json.loads(ir)
+        elif isinstance(ir, (bytes, bytearray, memoryview)):
+            ir = decode_ir(ir)
+        names = self._free_references(ir.get('plan', [])) if inputs is None else list(inputs)
+        if validate:
+            errors = self._validator(ir, set(self.variables) | set(names))
+            if errors:
+                raise ValueError("; ".join(errors))
+        program = compile_plan(ir, self, names)
+        names = None if outputs is None else list(outputs)
+        
+        while chunk:
+            for result in program.run_batch(chunk, names):
+                if isinstance(result, Exception):
+                    message = result.args[0] if isinstance(result, KeyError) else str(result)
+                    yield {'success': False, 'outputs': {}, 'log': [f"✗ {message}"]}
+                else:
+                    yield {'success': True, 'outputs': result, 'log': []}
+            chunk = list(islice(records, chunk_size))
+    
+    def _free_references(self, plan: List[Dict[str, Any]]) -> List[str]:
+        """Bare names read before any op defines them and not held in self.variables"""
+        free, defined = [], set()
+        for op in plan:
+            for value in op.get('in', {}).values():
+                if (isinstance(value, str) and not value.startswith(('utf8:', 'blob:', 'file:'))
+                        and value not in defined and value not in self.variables and value not in free):
+                    free.append(value)
+            if op.get('out'):
+                defined.add(op['out'])
+        return free
+    
+    def _find_fusions(self, plan: List[Dict[str, Any]]) -> Dict[int, Dict[int, List[int]]]:
+        """Find compress ops whose output feeds hash/encode chains
+        
+        Returns {compress index: {op index: [consumer indices]}} for every
+        compress that has at least one consumer. A consumer joins a chain only
+        while the value it reads has not been redefined.
+        """
+        producers = {}  # name -> index of the compress/encode op that last defined it
+        children = {}
+        for index, op in enumerate(plan):
+            name = op.get('op')
+            data = op.get('in', {}).get('data')
+            if name in ('hash', 'encode') and isinstance(data, str) and data in producers:
+                children.setdefault(producers[data], []).append(index)
+            out = op.get('out')
+            if out:
+                params = op.get('params', {})
+                fusable = name == 'encode' or (name == 'compress' and params.get('level', 6) != 0
+                                               and params.get('use') in _ZLIB_NAMES and not params.get('dict'))
+                if fusable:
+                    producers[out] = index
+                else:
+                    producers.pop(out, None)
+        
+        fusions = {}
+        for index, op in enumerate(plan):
+            if op.get('op') == 'compress' and index in children:
+                tree, stack = {}, [index]
+                while stack:
+                    node = stack.pop()
+                    tree[node] = children.get(node, [])
+                    stack.extend(tree[node])
+                fusions[index] = tree
+        return fusions
+    
+    def _run_fused(self, plan: List[Dict[str, Any]], root: int, tree: Dict[int, List[int]]) -> Dict[int, Any]:
+        """Run a compress chain as one streaming pass, returning {op index: result}
+        
+        The payload is compressed in slices; each base64 chunk is hashed and
+        re-encoded by the downstream ops as it is produced, so no full-size
+        intermediate copy is made before the outputs are assembled.
+        """
+        op = plan[root]
+        try:
+            inputs = self._resolve_inputs(op.get('in', {}))
+            data = inputs.get('payload', '')
+            if not isinstance(data, str):
+                data = as_bytes(data)
+            compressor = zlib.compressobj(op.get('params', {}).get('level', 6))
+        except Exception:
+            return {root: self._execute_op(op)}
+        
+        buffers = {index: bytearray() for index in tree if plan[index]['op'] != 'hash'}
+        streams = {index: _Base64Stream() for index in buffers}
+        hashes = {index: hashlib.sha256() for index in tree if index not in buffers}
+        
+        def emit(index: int, chunks: Tuple[bytes, ...]):
+            """Deliver base64 chunks produced by op index to its consumers"""
+            for chunk in chunks:
+                buffers[index] += chunk
+                for child in tree[index]:
+                    if child in hashes:
+                        hashes[child].update(chunk)
+                    else:
+                        emit(child, streams[child].feed(chunk))
+        
+        def flush(index: int):
+            emit(index, streams[index].flush())
+            for child in tree[index]:
+                if child in streams:
+                    flush(child)
+        
+        compressed = []
+        
+        def feed(out: bytes):
+            compressed.append(out)
+            emit(root, streams[root].feed(out))
+        
+        if isinstance(data, str):
+            for start in range(0, len(data), FUSION_CHUNK):
+                feed(compressor.compress(data[start:start + FUSION_CHUNK].encode('utf-8')))
+        else:
+            view = memoryview(data)
+            for start in range(0, len(view), FUSION_CHUNK):
+                feed(compressor.compress(view[start:start + FUSION_CHUNK]))
+        feed(compressor.flush())
+        flush(root)
+        
+        # Same values as the unfused ops: an encode's raw bytes are the base64
+        # text it read, which its parent's buffer already holds
+        text = {index: bytes(buffer) for index, buffer in buffers.items()}
+        results = {index: h.hexdigest() for index, h in hashes.items()}
+        results[root] = Base64Value(b''.join(compressed), text[root])
+        for parent in text:
+            for child in tree[parent]:
+                if child in text:
+                    results[child] = Base64Value(text[parent], text[child])
         return results
     
-    def _execute_op(self, op: Dict[str, Any]) -> Any:
+    def _execute_op(self, op: Dict[str, Any], bindings: Optional[Dict[str, Any]] = None) -> Any:
         """Execute a single operation"""
         op_name = op['op']
         if op_name not in self.operations:
             raise ValueError(f"Unknown operation: {op_name}")
             
         # Resolve inputs
-        inputs = self._resolve_inputs(op.get('in', {}))
-        params = op.get('params', {})
+        inputs = self._resolve_inputs(op.get('in', {}), bindings)
+        return self._apply(op_name, op.get('in', {}), inputs, op.get('params', {}))
+    
+    def _apply(self, op_name: str, raw_inputs: Dict[str, Any], inputs: Dict[str, Any],
+               params: Dict[str, Any]) -> Any:
+        """Run a handler on resolved inputs, through the result cache if set"""
+        cache = self.result_cache
+        if cache is not None:
+            key = cache.key_for(op_name, raw_inputs, inputs, params)
+            if key is not None:
+                result = cache.get(*key)
+                if result is None:
+                    result = self.operations[op_name](inputs, params)
+                    cache.put(key[0], result)
+                return result
         
         # Execute operation
         return self.operations[op_name](inputs, params)
     
-    def _resolve_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Resolve variable references in inputs"""
+    def _resolve_inputs(self, inputs: Dict[str, Any], bindings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Resolve variable references in inputs (bindings take precedence over variables)"""
         resolved = {}
         for key, value in inputs.items():
             if isinstance(value, str):
                 if value.startswith('utf8:'):
                     # Direct UTF-8 string
                     resolved[key] = value[5:]
+                elif value.startswith('blob:'):
+                    # Stored payload, mapped rather than copied
+                    resolved[key] = self._open_blob(value)
+                elif value.startswith('file:'):
+                    # File reference; only file-reading ops open it
+                    resolved[key] = FileRef(value)
+                elif bindings and value in bindings:
+                    resolved[key] = bindings[value]
                 elif value in self.variables:
                     # Variable reference
                     resolved[key] = self.variables[value]
@@ -80,47 +518,139 @@ class KrisperExecutor:
                 resolved[key] = value
         return resolved
     
-    def _op_compress(self, inputs: Dict, params: Dict) -> str:
-        """Compress data using zlib"""
-        data = inputs.get('payload', '')
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-            
-        compressed = zlib.compress(data, level=params.get('level', 6))
-        return base64.b64encode(compressed).decode('ascii')
+    def _open_blob(self, ref: str) -> memoryview:
+        store = self.blob_store or get_blob_store()
+        if store is None:
+            raise ValueError(f"No blob store configured for {ref}")
+        return store.open(ref)
+    
+    def _op_compress(self, inputs: Dict, params: Dict) -> Base64Value:
+        """Compress data with the codec named by params['use'] (zlib by default)"""
+        data = as_bytes(inputs.get('payload', ''))
+        return Base64Value(codecs.compress(data, params, self.zdict_store))
     
     def _op_decompress(self, inputs: Dict, params: Dict) -> str:
-        """Decompress zlib data"""
+        """Decompress data, using the codec recorded in it"""
         data = inputs.get('data', '')
-        compressed = base64.b64decode(data)
-        decompressed = zlib.decompress(compressed)
+        compressed = data.raw if isinstance(data, Base64Value) else base64.b64decode(data)
+        decompressed = codecs.decompress(compressed, params, self.zdict_store)
         return decompressed.decode('utf-8')
     
     def _op_compare(self, inputs: Dict, params: Dict) -> bool:
         """Compare two values"""
         a = inputs.get('a', inputs.get('left'))
         b = inputs.get('b', inputs.get('right'))
+        if isinstance(a, Base64Value) and isinstance(b, Base64Value):
+            return a.raw == b.raw
+        # Otherwise a Base64Value compares as the text it renders to
+        if isinstance(a, Base64Value):
+            a = a.text()
+        if isinstance(b, Base64Value):
+            b = b.text()
+        # Binary IR literals and loaded files are memoryviews; compare them with text as UTF-8
+        if isinstance(a, str) and isinstance(b, memoryview):
+            a = a.encode('utf-8')
+        elif isinstance(b, str) and isinstance(a, memoryview):
+            b = b.encode('utf-8')
+        if isinstance(a, memoryview) or isinstance(b, memoryview):
+            if isinstance(a, (bytes, bytearray, memoryview)) and isinstance(b, (bytes, bytearray, memoryview)):
+                return _buffers_equal(a, b)
         return a == b
     
     def _op_hash(self, inputs: Dict, params: Dict) -> str:
-        """Hash data using SHA256"""
+        """Hash data using SHA256 (a chunk stream is hashed as it is consumed)"""
         data = inputs.get('data', '')
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        return hashlib.sha256(data).hexdigest()
+        if hasattr(data, '__next__'):
+            digest = hashlib.sha256()
+            for chunk in _iter_chunks(data, STREAM_CHUNK):
+                digest.update(chunk)
+            return digest.hexdigest()
+        return hashlib.sha256(as_bytes(data)).hexdigest()
     
-    def _op_encode(self, inputs: Dict, params: Dict) -> str:
-        """Encode data as base64"""
-        data = inputs.get('data', '')
-        if isinstance(data, str):
-            data = data.encode('utf-8')
-        return base64.b64encode(data).decode('ascii')
+    def _op_encode(self, inputs: Dict, params: Dict) -> Base64Value:
+        """Encode data as base64 (lazily: the input bytes are kept as-is)"""
+        return Base64Value(as_bytes(inputs.get('data', '')))
     
     def _op_decode(self, inputs: Dict, params: Dict) -> str:
         """Decode base64 data"""
         data = inputs.get('data', '')
-        decoded = base64.b64decode(data)
-        return decoded.decode('utf-8')
+        decoded = data.raw if isinstance(data, Base64Value) else base64.b64decode(data)
+        return str(decoded, 'utf-8')
+
+    def _op_copy(self, inputs: Dict, params: Dict) -> Any:
+        """Copy a literal or variable (emitted by the optimizer)"""
+        return inputs.get('value')
+    
+    def _op_load(self, inputs: Dict, params: Dict) -> memoryview:
+        """Map a file read-only and return a memoryview over it
+        
+        hash, compress and compare read the mapping directly, so files of
+        any size are processed without being copied into memory.
+        """
+        path = inputs.get('path', '')
+        if isinstance(path, FileRef):
+            path = path.path
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return memoryview(b'')  # mmap refuses empty files
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    
+    def _op_compress_stream(self, inputs: Dict, params: Dict) -> Any:
+        """Compress a file or chunk stream with bounded memory
+        
+        Output is a raw zlib stream (not base64). With a "file:" dest it is
+        written there and a byte count summary is returned; otherwise the
+        result is a single-use iterator of compressed chunks.
+        """
+        size = params.get('chunk_size', STREAM_CHUNK)
+        compressor = zlib.compressobj(params.get('level', 6))
+        stats = {'bytes_in': 0, 'bytes_out': 0}
+        source = _iter_chunks(inputs.get('source', ''), size)
+        
+        def chunks():
+            for chunk in source:
+                stats['bytes_in'] += len(chunk)
+                out = compressor.compress(chunk)
+                if out:
+                    stats['bytes_out'] += len(out)
+                    yield out
+            out = compressor.flush()
+            stats['bytes_out'] += len(out)
+            yield out
+        
+        return _sink(chunks(), inputs.get('dest'), stats)
+    
+    def _op_decompress_stream(self, inputs: Dict, params: Dict) -> Any:
+        """Decompress a raw zlib file or chunk stream with bounded memory
+        
+        Each step inflates at most chunk_size bytes, so highly compressible
+        input cannot balloon memory. Returns like compress_stream.
+        """
+        size = params.get('chunk_size', STREAM_CHUNK)
+        decompressor = zlib.decompressobj()
+        stats = {'bytes_in': 0, 'bytes_out': 0}
+        source = inputs.get('source', b'')
+        if isinstance(source, Base64Value):
+            source = source.raw  # A compress result: its bytes, not its base64 text
+        source = _iter_chunks(source, size)
+        
+        def chunks():
+            for chunk in source:
+                stats['bytes_in'] += len(chunk)
+                while chunk:
+                    out = decompressor.decompress(chunk, size)
+                    chunk = decompressor.unconsumed_tail
+                    if out:
+                        stats['bytes_out'] += len(out)
+                        yield out
+            out = decompressor.flush()
+            if out:
+                stats['bytes_out'] += len(out)
+                yield out
+            if not decompressor.eof:
+                raise ValueError("Truncated zlib stream")
+        
+        return _sink(chunks(), inputs.get('dest'), stats)
 
 def demonstrate_executor():
     """Show the executor in action"""
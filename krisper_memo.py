@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+KRISPER Result Cache - Content-addressed memoization of executor op results
+Byte-budgeted in-memory LRU with an optional on-disk tier shared between workers
+"""
+
+import json
+import hashlib
+from typing import Dict, Any, Optional, Tuple
+from krisper_cache import TieredCache
+from krisper_values import Base64Value
+
+# Pure ops worth memoizing: a hit must save more than digesting the input
+# costs, which rules out hash (the key is itself a SHA-256 of the input) and
+# the base64 ops (encode is lazy, decode is cheaper than the digest)
+MEMO_OPS = frozenset({'compress', 'decompress'})
+
+# On-disk value tags
+_TAG_STR = b's'
+_TAG_B64 = b'b'
+
+def _value_size(value: Any) -> int:
+    if isinstance(value, Base64Value):
+        return memoryview(value.raw).nbytes
+    if isinstance(value, str):
+        return len(value)
+    return memoryview(value).nbytes
+
+class ResultCache(TieredCache):
+    """Cache op results by a digest of op name, params and resolved inputs"""
+
+    def __init__(self, max_bytes: int = 64 << 20, cache_dir: Optional[str] = None,
+                 min_bytes: int = 1024, max_disk_bytes: Optional[int] = None):
+        # The disk tier gets the same byte budget as memory unless told otherwise
+        super().__init__(max_bytes, cache_dir, max_bytes if max_disk_bytes is None else max_disk_bytes)
+        self.min_bytes = min_bytes  # Smaller inputs are cheaper to recompute than to digest
+        self.bytes_saved = 0  # Input bytes not reprocessed thanks to hits
+
+    @property
+    def max_bytes(self) -> int:
+        return self.capacity
+
+    @property
+    def size_bytes(self) -> int:
+        return self.size
+
+    def key_for(self, name: str, raw_inputs: Dict[str, Any], inputs: Dict[str, Any],
+                params: Dict[str, Any]) -> Optional[Tuple[str, int]]:
+        """(digest, input bytes) for an op call, or None if it should not be cached
+
+        Blob references are already content addresses and are used as-is.
+        """
+        if name not in MEMO_OPS:
+            return None
+        h = hashlib.sha256(name.encode('utf-8') + b'\0')
+        h.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        size = 0
+        for input_key in sorted(inputs):
+            raw, value = raw_inputs.get(input_key), inputs[input_key]
+            h.update(b'\0' + input_key.encode('utf-8') + b'\0')
+            if isinstance(raw, str) and raw.startswith('blob:'):
+                h.update(b'r' + raw.encode('ascii'))
+                size += memoryview(value).nbytes
+            elif isinstance(value, str):
+                data = value.encode('utf-8')
+                h.update(b's' + hashlib.sha256(data).digest())
+                size += len(data)
+            elif isinstance(value, Base64Value):
+                h.update(b'b' + hashlib.sha256(value.raw).digest())
+                size += memoryview(value.raw).nbytes
+            elif isinstance(value, (bytes, bytearray, memoryview)):
+                h.update(b'm' + hashlib.sha256(value).digest())
+                size += memoryview(value).nbytes
+            else:
+                return None
+        return (h.hexdigest(), size) if size >= self.min_bytes else None
+
+    def get(self, key: str, input_bytes: int = 0) -> Optional[Any]:
+        """Look up a result in memory, then on disk"""
+        value = super().get(key)
+        if value is not None:
+            with self._lock:
+                self.bytes_saved += input_bytes
+        return value
+
+    def put(self, key: str, value: Any):
+        """Insert a result in memory and on disk"""
+        if isinstance(value, (str, Base64Value)):
+            super().put(key, value)
+
+    def _reset_counters(self):
+        super()._reset_counters()
+        self.bytes_saved = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters, hit rate and bytes saved"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'disk_hits': self.disk_hits,
+                'bytes_saved': self.bytes_saved,
+                'size_bytes': self.size,
+                'max_bytes': self.capacity,
+                'entries': len(self._entries),
+            }
+
+    def _weight(self, value: Any) -> int:
+        return _value_size(value)
+
+    def _encode(self, value: Any) -> bytes:
+        if isinstance(value, Base64Value):
+            return _TAG_B64 + bytes(value.raw)
+        return _TAG_STR + value.encode('utf-8')
+
+    def _decode(self, data: bytes) -> Any:
+        tag, body = data[:1], data[1:]
+        if tag == _TAG_B64:
+            return Base64Value(body)
+        if tag == _TAG_STR:
+            return body.decode('utf-8')
+        return None
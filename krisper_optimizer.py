@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+KRISPER Optimizer - IR pass pipeline run between compile and execute
+Constant folding, common subexpression elimination and dead-op elimination
+"""
+
+import json
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+from krisper_executor import KrisperExecutor
+from krisper_values import public
+
+# Ops with side effects, single-use iterator results or file reads: never folded, merged or dropped
+_OPAQUE = {'compress_stream', 'decompress_stream', 'load'}
+
+def optimize(ir: Dict[str, Any], keep: Optional[Iterable[str]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Optimize an IR plan, returning (optimized IR, report)
+
+    keep names the outputs the caller reads; by default every output is kept
+    and only ops without an output (or whose output is overwritten unread)
+    are dead. Folded and merged ops become `copy` ops so their outputs still
+    appear in the executor's results. Dead ops are dropped without running,
+    so any error they would have raised is dropped with them.
+    """
+    if isinstance(ir, str):
+        ir = json.loads(ir)
+    plan = [dict(op) for op in ir.get('plan', [])]
+    report = {'folded': [], 'merged': [], 'dead': [], 'ops_before': len(plan)}
+
+    plan = _fold_and_merge(plan, report)
+    plan = _eliminate_dead(plan, keep, report)
+
+    report['ops_after'] = len(plan)
+    optimized = dict(ir)
+    optimized['plan'] = plan
+    return optimized, report
+
+def _fold_and_merge(plan: List[Dict[str, Any]], report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Forward pass: fold ops over literals and merge repeated computations"""
+    operations = KrisperExecutor().operations
+    # Only names defined exactly once can stand in for another op's output
+    defs = {}
+    for op in plan:
+        if op.get('out'):
+            defs[op['out']] = defs.get(op['out'], 0) + 1
+
+    env = {}        # out -> ('const', value) | ('var', canonical name, definition number)
+    available = {}  # (op, inputs, params) -> canonical name holding the result
+    for n, op in enumerate(plan):
+        name, out = op['op'], op.get('out')
+        inputs = {}
+        keys = []
+        literal = True
+        for key, value in op.get('in', {}).items():
+            value, term = _canonical(value, env)
+            inputs[key] = value
+            keys.append((key, term))
+            literal = literal and term[0] == 'lit'
+        op['in'] = inputs
+        if name not in operations or name == 'copy' or name in _OPAQUE:
+            # Unknown ops are left alone (the executor reports them at run time), as are opaque ones
+            if out:
+                env[out] = ('var', out, n)
+            continue
+
+        if literal or _is_self_compare(name, keys):
+            try:
+                if literal:
+                    value = public(operations[name]({k: t[1] for k, t in keys}, op.get('params', {})))
+                else:
+                    value = True
+            except Exception:
+                value = _UNFOLDABLE
+            if value is not _UNFOLDABLE:
+                if out:
+                    env[out] = ('const', value)
+                    report['folded'].append(out)
+                op.clear()
+                op.update(_copy_op(_literal(value), out))
+                continue
+
+        signature = (name, tuple(sorted(keys)), json.dumps(op.get('params', {}), sort_keys=True))
+        if signature in available and out:
+            source = available[signature]
+            env[out] = env[source]
+            report['merged'].append({'out': out, 'same_as': source})
+            op.clear()
+            op.update(_copy_op(source, out))
+            continue
+        if out:
+            env[out] = ('var', out, n)
+            if defs[out] == 1:
+                available[signature] = out
+    return plan
+
+def _eliminate_dead(plan: List[Dict[str, Any]], keep: Optional[Iterable[str]],
+                    report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Backward pass: drop known ops whose result nobody reads"""
+    operations = KrisperExecutor().operations
+    defined = {op['out'] for op in plan if op.get('out')}
+    live = set(defined if keep is None else keep)
+    kept = []
+    for op in reversed(plan):
+        out = op.get('out')
+        if op['op'] in operations and op['op'] not in _OPAQUE and (not out or out not in live):
+            report['dead'].append(op)
+            continue
+        live.discard(out)
+        for value in op.get('in', {}).values():
+            if isinstance(value, str) and value in defined:
+                live.add(value)
+        kept.append(op)
+    report['dead'].reverse()
+    kept.reverse()
+    return kept
+
+_UNFOLDABLE = object()
+
+def _canonical(value: Any, env: Dict[str, tuple]) -> Tuple[Any, tuple]:
+    """Rewrite an input through env; return (new input, hashable term)
+
+    Terms are ('lit', value) for literals known at compile time,
+    ('var', name, definition) for plan outputs and ('raw', value) for anything
+    else, such as variables left in the executor by an earlier plan.
+    """
+    if isinstance(value, str):
+        if value.startswith('utf8:'):
+            return value, ('lit', value[5:])
+        if value in env:
+            term = env[value]
+            if term[0] == 'const':
+                return _literal(term[1]), ('lit', term[1])
+            return term[1], term
+        return value, ('raw', value)
+    try:
+        hash(value)
+    except TypeError:
+        return value, ('raw', json.dumps(value, sort_keys=True))
+    return value, ('lit', value)
+
+def _is_self_compare(name: str, keys: List[Tuple[str, tuple]]) -> bool:
+    """compare of a computed value with itself is always true"""
+    terms = [term for _, term in keys]
+    return name == 'compare' and len(terms) == 2 and terms[0] == terms[1] and terms[0][0] == 'var'
+
+def _literal(value: Any) -> Any:
+    """Encode a folded value as an IR input"""
+    return f"utf8:{value}" if isinstance(value, str) else value
+
+def _copy_op(value: Any, out: Optional[str]) -> Dict[str, Any]:
+    op = {"op": "copy", "in": {"value": value}}
+    if out:
+        op["out"] = out
+    return op
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+KRISPER Validator - Reject malformed IR plans before any op runs
+Checks are generated once from a declarative schema and applied in one pass
+"""
+
+import json
+from typing import Dict, List, Any, Callable, Iterable
+
+# Param rule for a nested plan, validated with the same schema. The nested
+# plan sees the executor's variables but not the enclosing plan's outputs.
+PLAN = 'plan'
+
+# op -> required input slots (a tuple names interchangeable keys), optional
+# inputs and params as {name: type, (type, allowed values) or PLAN}
+SCHEMA = {
+    'compress': {
+        'in': ('payload',),
+        'params': {'level': (int, range(-1, 10)), 'use': str, 'seed': int,
+                   'target_mbps': ((int, float), None), 'max_latency_ms': ((int, float), None),
+                   'dict': str},
+    },
+    'decompress': {'in': ('data',), 'params': {'dict': str}},
+    'compare': {'in': (('a', 'left'), ('b', 'right'))},
+    'hash': {'in': ('data',)},
+    'encode': {'in': ('data',)},
+    'decode': {'in': ('data',)},
+    'copy': {'in': ('value',)},
+    'load': {'in': ('path',)},
+    'compress_stream': {
+        'in': ('source',),
+        'optional': ('dest',),
+        'params': {'level': (int, range(-1, 10)), 'chunk_size': (int, range(1, 1 << 31))},
+    },
+    'decompress_stream': {
+        'in': ('source',),
+        'optional': ('dest',),
+        'params': {'chunk_size': (int, range(1, 1 << 31))},
+    },
+}
+
+Validator = Callable[..., List[str]]
+
+def compile_validator(schema: Dict[str, Dict[str, Any]]) -> Validator:
+    """Build a validator for schema; the returned function lists plan errors"""
+    rules = {}
+    for name, spec in schema.items():
+        slots = tuple(frozenset((slot,) if isinstance(slot, str) else slot)
+                      for slot in spec.get('in', ()))
+        allowed = frozenset().union(*slots, spec.get('optional', ()))
+        params = {key: _param_check(list if rule is PLAN else rule)
+                  for key, rule in spec.get('params', {}).items()}
+        nested = frozenset(key for key, rule in spec.get('params', {}).items() if rule is PLAN)
+        rules[name] = (slots, allowed, params, nested)
+
+    def validate(ir: Any, variables: Iterable[str] = ()) -> List[str]:
+        """Return a list of problems with ir (empty if it is valid)
+
+        variables names values already held by the executor. Every bare string
+        input must name one of them or the output of an earlier op.
+        """
+        if isinstance(ir, str):
+            ir = json.loads(ir)
+        elif isinstance(ir, (bytes, bytearray, memoryview)):
+            from krisper_binary import decode_ir
+            ir = decode_ir(ir)
+        plan = ir.get('plan') if isinstance(ir, dict) else None
+        if not isinstance(plan, list):
+            return ["plan: expected a list of ops"]
+
+        errors = []
+        defined = set(variables)
+        for index, op in enumerate(plan):
+            name = op.get('op') if isinstance(op, dict) else None
+            rule = rules.get(name)
+            if rule is None:
+                errors.append(f"op {index}: unknown operation {name!r}")
+                continue
+            slots, allowed, params, nested = rule
+            where = f"op {index} ({name})"
+
+            inputs = op.get('in', {})
+            if not isinstance(inputs, dict):
+                errors.append(f"{where}: 'in' must be an object")
+                inputs = {}
+            for slot in slots:
+                if slot.isdisjoint(inputs):
+                    errors.append(f"{where}: missing input {'/'.join(sorted(slot))!r}")
+            for key, value in inputs.items():
+                if key not in allowed:
+                    errors.append(f"{where}: unexpected input {key!r}")
+                elif (isinstance(value, str) and value not in defined
+                        and not value.startswith(('utf8:', 'blob:', 'file:'))):
+                    errors.append(f"{where}: undefined variable {value!r}")
+
+            op_params = op.get('params', {})
+            if not isinstance(op_params, dict):
+                errors.append(f"{where}: 'params' must be an object")
+                op_params = {}
+            for key, value in op_params.items():
+                check = params.get(key)
+                if check is None:
+                    errors.append(f"{where}: unexpected param {key!r}")
+                elif not check(value):
+                    errors.append(f"{where}: invalid param {key}={value!r}")
+                elif key in nested:
+                    errors.extend(f"{where} {key}: {error}"
+                                  for error in validate({'plan': value}, variables))
+
+            out = op.get('out')
+            if out is not None:
+                if not isinstance(out, str) or not out:
+                    errors.append(f"{where}: 'out' must be a non-empty string")
+                else:
+                    defined.add(out)
+        return errors
+
+    return validate
+
+def _param_check(rule: Any) -> Callable[[Any], bool]:
+    kind, allowed = rule if isinstance(rule, tuple) else (rule, None)
+    if allowed is None:
+        # bool is an int subclass but never a valid numeric param
+        return lambda value: isinstance(value, kind) and not isinstance(value, bool)
+    return lambda value: isinstance(value, kind) and not isinstance(value, bool) and value in allowed
+
+validate_ir = compile_validator(SCHEMA)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+KRISPER Values - Native binary values for the executor variable store
+Ops pass bytes between each other; text forms are produced only on demand
+"""
+
+import base64
+from typing import Any, Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+class Base64Value:
+    """Binary data whose public (output) form is its base64 text
+
+    compress and encode results are held this way, so a later decompress or
+    decode reads raw directly instead of decoding base64 text.
+    """
+
+    __slots__ = ('raw', '_ascii')
+
+    def __init__(self, raw: Buffer, ascii: Optional[bytes] = None):
+        self.raw = raw
+        self._ascii = ascii
+
+    def ascii(self) -> bytes:
+        """The base64 form as ASCII bytes, computed once"""
+        if self._ascii is None:
+            self._ascii = base64.b64encode(self.raw)
+        return self._ascii
+
+    def text(self) -> str:
+        return self.ascii().decode('ascii')
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Base64Value):
+            return self.raw == other.raw
+        if isinstance(other, str):
+            return self.text() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return self.text()
+
+    def __repr__(self) -> str:
+        return f"Base64Value({len(self.raw)} bytes)"
+
+class FileRef(str):
+    """A "file:<path>" reference written in the IR
+
+    Inputs become FileRef only when the IR itself names a file, so resolved
+    text that merely starts with "file:" (such as utf8:file:...) stays data.
+    Ops that do not read files see the reference as its text.
+    """
+
+    __slots__ = ()
+
+    @property
+    def path(self) -> str:
+        return self[5:]
+
+def public(value: Any) -> Any:
+    """The form a value takes in results['outputs'] and serialized IR"""
+    return value.text() if isinstance(value, Base64Value) else value
+
+def as_bytes(value: Any) -> Buffer:
+    """Bytes view of a value as the text ops see it (str is UTF-8 encoded)"""
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, Base64Value):
+        return value.ascii()
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        # Fail inside the op, not later when an output is rendered
+        raise TypeError(f"a bytes-like object is required, not '{type(value).__name__}'")
+    return value
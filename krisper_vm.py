@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+KRISPER VM - Compile a plan once into slot-indexed instructions
+Repeated runs skip op lookup, input prefix checks and variable dict access
+"""
+
+import json
+from typing import Dict, List, Any, Iterable, Optional
+from krisper_binary import decode_ir
+from krisper_values import FileRef, public
+
+class Program:
+    """A plan compiled against one executor's op handlers
+
+    Registers hold constants first, then bound inputs, then one slot per op
+    output (a redefined name gets a fresh slot), so every instruction reads
+    its inputs by index. The instruction array is also turned into one
+    straight-line Python function, so a run pays no per-op dispatch loop.
+    """
+
+    def __init__(self, code: List[tuple], registers: List[Any], inputs: Dict[str, int],
+                 outputs: Dict[str, int], names: List[str]):
+        self.code = code            # (handler, input keys, input slots, params, out slot)
+        self.registers = registers  # Initial register file: constants, then placeholders
+        self.inputs = inputs        # Binding name -> slot
+        self.outputs = outputs      # Output name -> slot holding its final value
+        self.names = names          # Op names, for error messages
+        self._execute = _generate(code)
+        self._columns = None  # Column-wise steps, generated on first run_batch
+
+    def run(self, bindings: Optional[Dict[str, Any]] = None,
+            outputs: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Run with bindings for the program's inputs and return rendered outputs
+
+        Raises ValueError naming the failing op; missing bindings raise
+        KeyError before anything runs.
+        """
+        regs = self.run_raw(bindings)
+        names = self.outputs if outputs is None else outputs
+        return {name: public(regs[self.outputs[name]]) for name in names}
+
+    def run_raw(self, bindings: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Run and return the register file with values left native"""
+        regs = self.registers[:]
+        if self.inputs:
+            if bindings is None:
+                bindings = {}
+            for name, slot in self.inputs.items():
+                if name not in bindings:
+                    raise KeyError(f"Missing binding: {name}")
+                regs[slot] = bindings[name]
+        state = [0]  # Program counter, kept current by the generated code
+        try:
+            self._execute(regs, state)
+        except Exception as e:
+            pc = state[0]
+            raise ValueError(f"op {pc} ({self.names[pc]}): {e}") from e
+        return regs
+
+    def run_batch(self, rows: List[Dict[str, Any]],
+                  outputs: Optional[Iterable[str]] = None) -> List[Any]:
+        """Run once per binding dict, one op at a time across all rows
+
+        Each op's handler and params stay hot while it sweeps the rows, and a
+        row that fails drops out of later ops without stopping the others.
+        Returns, per row, its rendered outputs or the exception it raised
+        (ValueError naming the failing op, or KeyError for a missing binding).
+        """
+        if self._columns is None:
+            self._columns = [_generate_column(pc, instruction) for pc, instruction in enumerate(self.code)]
+        results = [None] * len(rows)
+        live, files = [], []
+        for index, bindings in enumerate(rows):
+            regs = self.registers[:]
+            try:
+                for name, slot in self.inputs.items():
+                    regs[slot] = bindings[name]
+            except KeyError as e:
+                results[index] = KeyError(f"Missing binding: {e.args[0]}")
+                continue
+            live.append(index)
+            files.append(regs)
+
+        for pc, column in enumerate(self._columns):
+            if not files:
+                break
+            failures = column(files)
+            if failures:
+                for position, e in failures:
+                    results[live[position]] = ValueError(f"op {pc} ({self.names[pc]}): {e}")
+                failed = {position for position, _ in failures}
+                live = [index for position, index in enumerate(live) if position not in failed]
+                files = [regs for position, regs in enumerate(files) if position not in failed]
+
+        names = list(self.outputs if outputs is None else outputs)
+        slots = [self.outputs[name] for name in names]
+        for index, regs in zip(live, files):
+            results[index] = {name: public(regs[slot]) for name, slot in zip(names, slots)}
+        return results
+
+def _generate(code: List[tuple]):
+    """Emit one function running every instruction with constant slot indices"""
+    namespace = {}
+    lines = ["def execute(regs, state):"]
+    for pc, (handler, keys, slots, params, out) in enumerate(code):
+        namespace[f"h{pc}"] = handler
+        namespace[f"p{pc}"] = params
+        args = ", ".join(f"{key!r}: regs[{slot}]" for key, slot in zip(keys, slots))
+        lines.append(f"    state[0] = {pc}")
+        lines.append(f"    regs[{out}] = h{pc}({{{args}}}, p{pc})")
+    lines.append("    return regs")
+    exec(compile("\n".join(lines), "<krisper program>", "exec"), namespace)
+    return namespace["execute"]
+
+def _generate_column(pc: int, instruction: tuple):
+    """Emit one function applying a single instruction to every register file"""
+    handler, keys, slots, params, out = instruction
+    namespace = {'h': handler, 'p': params}
+    args = ", ".join(f"{key!r}: regs[{slot}]" for key, slot in zip(keys, slots))
+    source = "\n".join([
+        "def column(files):",
+        "    failures = []",
+        "    for position, regs in enumerate(files):",
+        "        try:",
+        f"            regs[{out}] = h({{{args}}}, p)",
+        "        except Exception as e:",
+        "            failures.append((position, e))",
+        "    return failures",
+    ])
+    exec(compile(source, f"<krisper column {pc}>", "exec"), namespace)
+    return namespace["column"]
+
+def compile_plan(ir: Any, executor: Any = None, inputs: Iterable[str] = ()) -> Program:
+    """Compile ir into a Program using executor's handlers
+
+    inputs names external values supplied per run. Other bare references
+    that no earlier op defines are taken from executor.variables at compile
+    time, or kept as literal strings, matching KrisperExecutor.execute.
+    Literal and blob inputs are resolved once here.
+    """
+    if executor is None:
+        from krisper_executor import KrisperExecutor
+        executor = KrisperExecutor()
+    if isinstance(ir, str):
+        ir = json.loads(ir)
+    elif isinstance(ir, (bytes, bytearray, memoryview)):
+        ir = decode_ir(ir)
+
+    registers = []
+    constants = {}  # (type, value) -> slot, so repeated literals share a slot
+
+    def constant(value: Any) -> int:
+        # Only small immutable literals are shared; buffers are never hashed
+        key = (type(value), value) if value is None or isinstance(value, (str, int, float)) else None
+        if key is not None and key in constants:
+            return constants[key]
+        registers.append(value)
+        if key is not None:
+            constants[key] = len(registers) - 1
+        return len(registers) - 1
+
+    bound = {}
+    for name in inputs:
+        registers.append(None)
+        bound[name] = len(registers) - 1
+
+    code, names = [], []
+    current = {}  # Name -> slot of its latest definition
+    for op in ir.get('plan', []):
+        name = op['op']
+        handler = executor.operations.get(name)
+        if handler is None:
+            raise ValueError(f"Unknown operation: {name}")
+        keys, slots = [], []
+        for key, value in op.get('in', {}).items():
+            keys.append(key)
+            if isinstance(value, str):
+                if value.startswith('utf8:'):
+                    slot = constant(value[5:])
+                elif value.startswith('blob:'):
+                    slot = constant(executor._open_blob(value))
+                elif value.startswith('file:'):
+                    slot = constant(FileRef(value))
+                elif value in current:
+                    slot = current[value]
+                elif value in bound:
+                    slot = bound[value]
+                elif value in executor.variables:
+                    slot = constant(executor.variables[value])
+                else:
+                    slot = constant(value)
+            else:
+                slot = constant(value)
+            slots.append(slot)
+        registers.append(None)
+        out = len(registers) - 1
+        if op.get('out'):
+            current[op['out']] = out
+        code.append((handler, tuple(keys), tuple(slots), op.get('params', {}), out))
+        names.append(name)
+
+    return Program(code, registers, bound, current, names)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+KRISPER Dictionaries - Trained zlib preset dictionaries for small payloads
+Train a zdict from sample messages, store it under a versioned id, and
+compress/decompress with it through the `dict` param
+"""
+
+import os
+import zlib
+import heapq
+import threading
+from typing import List, Any, Iterable, Optional, Tuple, Union
+
+MAX_ZDICT = 32 * 1024  # deflate can only reach back 32 KiB
+
+def train_dictionary(samples: Iterable[Union[str, bytes]], size: int = 16 * 1024,
+                     segment: int = 256, k: int = 6) -> bytes:
+    """Build a preset dictionary from content shared across many samples
+
+    Every k-byte substring is scored by how many samples contain it.
+    Segments of up to `segment` bytes (whole samples, for small messages)
+    are then picked greedily by the total score of k-mers not yet covered,
+    and the best ones are placed at the end of the dictionary, where
+    deflate reaches them with the shortest distances.
+    """
+    docs = [s.encode('utf-8') if isinstance(s, str) else bytes(s) for s in samples]
+    size = min(size, MAX_ZDICT)
+    frequency = {}
+    for doc in docs:
+        for kmer in {doc[i:i + k] for i in range(len(doc) - k + 1)}:
+            frequency[kmer] = frequency.get(kmer, 0) + 1
+
+    # Candidate segments overlap by half; k-mers seen in only one sample are noise
+    candidates = {}
+    for doc in docs:
+        for start in range(0, max(len(doc) - segment, 0) + 1, max(segment // 2, 1)):
+            piece = doc[start:start + segment]
+            if len(piece) >= k and piece not in candidates:
+                candidates[piece] = frozenset(kmer for kmer in (piece[i:i + k] for i in range(len(piece) - k + 1))
+                                              if frequency[kmer] > 1)
+
+    covered = set()
+
+    def gain(kmers: frozenset) -> int:
+        return sum(frequency[kmer] for kmer in kmers if kmer not in covered)
+
+    # Lazy greedy: a segment's gain only shrinks as others are chosen, so a
+    # popped segment whose refreshed gain still tops the heap is the best one
+    heap = [(-gain(kmers), piece) for piece, kmers in candidates.items()]
+    heapq.heapify(heap)
+    chosen, total = [], 0
+    while heap and total < size:
+        _, piece = heapq.heappop(heap)
+        score = gain(candidates[piece])
+        if score <= 1:
+            continue
+        if heap and score < -heap[0][0]:
+            heapq.heappush(heap, (-score, piece))
+            continue
+        covered.update(candidates[piece])
+        chosen.append(piece)
+        total += len(piece)
+
+    # Most valuable segments go last, closest to the data being compressed
+    return b''.join(reversed(chosen))[-size:]
+
+class ZDictStore:
+    """Dictionaries kept under versioned ids such as "events@2"
+
+    With a root directory, dictionaries are files root/<name>@<version>
+    so every worker resolves the same ids.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root
+        self._dicts = {}        # id -> zdict bytes
+        self._compressors = {}  # (id, level) -> compressor primed with the dictionary
+        self._lock = threading.Lock()
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    def add(self, name: str, zdict: bytes) -> str:
+        """Store zdict as the next version of name and return its id"""
+        if '@' in name or os.sep in name:
+            raise ValueError(f"Invalid dictionary name: {name}")
+        if len(zdict) > MAX_ZDICT:
+            raise ValueError(f"Dictionary is {len(zdict)} bytes; the maximum is {MAX_ZDICT}")
+        with self._lock:
+            version = max((int(v) for n, v in self._ids() if n == name), default=0) + 1
+            dict_id = f"{name}@{version}"
+            if self.root:
+                with open(os.path.join(self.root, dict_id), 'xb') as f:
+                    f.write(zdict)
+            self._dicts[dict_id] = bytes(zdict)
+        return dict_id
+
+    def train(self, name: str, samples: Iterable[Union[str, bytes]], **options) -> str:
+        """Train a dictionary from samples and store it as the next version of name"""
+        return self.add(name, train_dictionary(samples, **options))
+
+    def get(self, dict_id: str) -> bytes:
+        with self._lock:
+            zdict = self._dicts.get(dict_id)
+            if zdict is None and self.root and '@' in dict_id and os.sep not in dict_id:
+                try:
+                    with open(os.path.join(self.root, dict_id), 'rb') as f:
+                        zdict = self._dicts[dict_id] = f.read()
+                except FileNotFoundError:
+                    pass
+        if zdict is None:
+            raise ValueError(f"Unknown dictionary: {dict_id}")
+        return zdict
+
+    def latest(self, name: str) -> str:
+        """Id of the newest version of name"""
+        versions = [int(v) for n, v in self._ids() if n == name]
+        if not versions:
+            raise ValueError(f"Unknown dictionary: {name}")
+        return f"{name}@{max(versions)}"
+
+    def compress(self, data: Any, dict_id: str, level: int = 6) -> bytes:
+        """zlib-compress data with a stored dictionary"""
+        key = (dict_id, level)
+        primed = self._compressors.get(key)
+        if primed is None:
+            # Loading a dictionary costs more than compressing a small message,
+            # so each call copies a compressor that has already loaded it
+            primed = self._compressors[key] = zlib.compressobj(level, zdict=self.get(dict_id))
+        compressor = primed.copy()
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: Any, dict_id: str) -> bytes:
+        decompressor = zlib.decompressobj(zdict=self.get(dict_id))
+        out = decompressor.decompress(data)
+        if not decompressor.eof:
+            raise ValueError("Truncated zlib stream")
+        return out
+
+    def _ids(self) -> List[Tuple[str, str]]:
+        ids = set(self._dicts)
+        if self.root:
+            ids.update(entry for entry in os.listdir(self.root) if '@' in entry)
+        return [tuple(dict_id.rsplit('@', 1)) for dict_id in ids]
+
+_default_store = None
+
+def get_zdict_store() -> ZDictStore:
+    """Shared store, rooted at KRISPER_ZDICT_DIR if set"""
+    global _default_store
+    root = os.environ.get('KRISPER_ZDICT_DIR') or None
+    if _default_store is None or _default_store.root != root:
+        _default_store = ZDictStore(root)
+    return _default_store
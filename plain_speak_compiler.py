@@ -18,12 +18,67 @@ VERBS = [
      lambda m,p: p.add("write_file", path=m["path"], data=m["data"])),
 ]
 
+# Literal leading word of a pattern, used to index VERBS by a line's first word
+_LEADING_WORD = re.compile(r"\^([A-Za-z_]+)(?= )")
+
+def _top_level_alternation(pat):
+    """True if pat has a | outside any group or character class"""
+    depth, in_class, escaped = 0, False, False
+    for ch in pat:
+        if escaped:
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif in_class:
+            in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            return True
+    return False
+
+_index_snapshot = None
+_index = {}
+_wildcards = []
+
+def register_verb(pattern, fn):
+    """Register an extra plain-speak verb; it is tried after the built-in ones"""
+    VERBS.append((pattern, fn))
+
+def _dispatch_index():
+    """Return (first word -> [(regex, fn)], wildcard list), rebuilt when VERBS changes"""
+    global _index_snapshot, _index, _wildcards
+    if _index_snapshot != VERBS:
+        keyed, wildcards = [], []
+        for pos, (pat, fn) in enumerate(VERBS):
+            # An alternative branch may start with any word, so those patterns are wildcards
+            lead = None if _top_level_alternation(pat) else _LEADING_WORD.match(pat)
+            entry = (pos, re.compile(pat, flags=re.I), fn)
+            if lead:
+                keyed.append((lead.group(1).lower(), entry))
+            else:
+                wildcards.append(entry)
+        # Each bucket keeps VERBS order, with wildcard patterns merged in
+        index = {}
+        for key, entry in keyed:
+            index.setdefault(key, []).append(entry)
+        _index = {key: [(rx, fn) for _, rx, fn in sorted(bucket + wildcards, key=lambda e: e[0])]
+                  for key, bucket in index.items()}
+        _wildcards = [(rx, fn) for _, rx, fn in wildcards]
+        _index_snapshot = list(VERBS)
+    return _index, _wildcards
+
 def compile_lines(lines):
     prog = Program()
+    index, wildcards = _dispatch_index()
     for raw in [l.strip() for l in lines if l.strip()]:
         matched=False
-        for pat,fn in VERBS:
-            m = re.match(pat, raw, flags=re.I)
+        for rx,fn in index.get(raw.split(None, 1)[0].lower(), wildcards):
+            m = rx.match(raw)
             if m: 
                 fn(m, prog)
                 matched=True
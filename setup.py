@@ -24,6 +24,19 @@ setup(
         "krisper_lowering",
         "whitespace_encoder",
         "krisper_executor",
+        "krisper_cache",
+        "krisper_binary",
+        "krisper_optimizer",
+        "krisper_estimator",
+        "krisper_blobs",
+        "krisper_validator",
+        "krisper_delta",
+        "krisper_values",
+        "krisper_vm",
+        "krisper_memo",
+        "krisper_codecs",
+        "krisper_zdict",
+        "krisper_async",
         "bio_executor"
     ],
     classifiers=[
@@ -4,7 +4,9 @@ KRISPER Test Suite - Verify the transpiler works correctly
 """
 
 import json
-from krisper import KrisperCompiler, ValidationError
+import tempfile
+import krisper
+from krisper import KrisperCompiler, ValidationError, compile_text
 
 def test_basic_compression():
     """Test basic compression operation"""
@@ -86,6 +88,838 @@ def test_multiple_compressions():
     assert result["plan"][1]["out"] == "b"
     print("✓ Multiple compressions test passed")
 
+def test_statement_order():
+    """Test statements compile in source order and quoted verbs are payload"""
+    compiler = KrisperCompiler()
+    result = compiler.compile("compress payload 'compare and explain' as a explain a compress payload 'b' as b")
+    
+    assert [op["op"] for op in result["plan"]] == ["compress", "explain", "compress"]
+    assert result["plan"][0]["in"]["payload"] == "utf8:compare and explain"
+    assert result["plan"][1]["in"]["ref"] == "a"
+    
+    # References resolve against earlier statements only; forward references are errors
+    try:
+        compiler.compile("compare x with y compress payload 'a' as x compress payload 'b' as y")
+        assert False, "Should have raised ValidationError"
+    except ValidationError as e:
+        assert str(e) == "UNDEFINED_REF:x"
+    
+    # attest and explain run where they are written, not after every compress
+    result = compiler.compile("compress payload 'a' as x explain x attest compress payload 'b' as y")
+    assert [op["op"] for op in result["plan"]] == ["compress", "explain", "attest", "compress"]
+    assert result["plan"][2]["in"]["artifact"] == "x"
+    result = compiler.compile("attest compress payload 'a' as x")
+    assert [op["op"] for op in result["plan"]] == ["attest", "compress"]
+    assert result["plan"][0]["in"]["artifact"] == "r1"
+    print("✓ Statement order test passed")
+
+def test_compile_cache():
+    """Test compile_text caches by normalized text, in memory and on disk"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = krisper.configure_cache(maxsize=1, cache_dir=cache_dir)
+        first = compile_text("compress payload 'hi' as a")
+        assert compile_text("  COMPRESS payload 'hi' as a ") == first
+        assert cache.stats()["hits"] == 1
+        
+        compile_text("compress payload 'other' as b")
+        assert cache.stats()["evictions"] == 1
+        
+        # A fresh worker finds the entry in the on-disk tier
+        cache = krisper.configure_cache(cache_dir=cache_dir)
+        assert compile_text("compress payload 'hi' as a") == first
+        assert cache.stats()["disk_hits"] == 1
+    krisper.configure_cache()
+    print("✓ Compile cache test passed")
+
+def test_compile_stream():
+    """Test streaming compilation matches compile() op for op"""
+    lines = ["compress payload 'a' as x\n", "compress payload 'b'\n", "as y compare x\n", "with y\n"]
+    compiler = KrisperCompiler()
+    
+    assert list(compiler.compile_stream(iter(lines))) == compiler.compile("".join(lines))["plan"]
+    try:
+        list(compiler.compile_stream(["", "   \n"]))
+        assert False, "Should have raised ValidationError"
+    except ValidationError as e:
+        assert "EMPTY_PAYLOAD" in str(e)
+    print("✓ Compile stream test passed")
+
+def test_compile_many():
+    """Test bulk compilation keeps input order and reports errors per item"""
+    texts = ["compress payload 'a' as a", "compare x with y", "", "compress payload 'b' as b"]
+    results = krisper.compile_many(texts, workers=2, chunksize=1)
+    
+    assert [r.get("error") for r in results] == [None, "UNDEFINED_REF:x", "EMPTY_PAYLOAD", None]
+    assert results[3]["plan"][0]["out"] == "b"
+    assert results == krisper.compile_many(texts, workers=1)
+    print("✓ Compile many test passed")
+
+def test_compile_session():
+    """Test incremental edits patch the plan to match a full recompile"""
+    lines = ["compress payload 'a' as x", "compress payload 'b' as y", "compare x with y", "explain y"]
+    session = krisper.CompileSession("\n".join(lines))
+    plan = session.plan
+    
+    edits = [(1, 2, ["compress payload 'c'"]), (0, 0, ["compress payload 'd'"]), (2, 3, ["compress payload 'b' as y"])]
+    for start, end, new_lines in edits:
+        session.edit(start, end, new_lines)
+        lines[start:end] = new_lines
+        if start == 1:
+            assert [str(e) for e in session.errors] == ["UNDEFINED_REF:y", "UNDEFINED_REF:y"]
+    
+    assert session.ir() == KrisperCompiler().compile("\n".join(lines))
+    assert session.plan is plan
+    print("✓ Compile session test passed")
+
+def test_binary_ir():
+    """Test binary IR round-trips and executes with memoryview payloads"""
+    from krisper_binary import encode_ir, decode_ir, to_json
+    from krisper_executor import KrisperExecutor
+    
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "utf8:hello hello"}, "params": {"level": 9}, "out": "c"},
+        {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+        {"op": "compare", "in": {"left": "utf8:hello hello", "right": "d"}, "out": "ok"}
+    ]}
+    blob = encode_ir(ir)
+    
+    assert isinstance(decode_ir(blob)["plan"][0]["in"]["payload"], memoryview)
+    assert json.loads(to_json(blob)) == ir
+    results = KrisperExecutor().execute(blob)
+    assert results["outputs"] == KrisperExecutor().execute(ir)["outputs"]
+    assert results["outputs"]["ok"] is True
+    print("✓ Binary IR test passed")
+
+def test_shared_compiler_threads():
+    """Test one compiler instance can serve concurrent threads"""
+    from concurrent.futures import ThreadPoolExecutor
+    compiler = KrisperCompiler()
+    texts = [f"compress payload 'p{i}' compress payload 'q' as v{i} compare r with v{i}" for i in range(200)]
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(compiler.compile, texts))
+    assert results == [KrisperCompiler().compile(text) for text in texts]
+    print("✓ Shared compiler threads test passed")
+
+def test_import_budget():
+    """Test importing krisper stays cheap: heavy modules load only on use"""
+    import os
+    import subprocess
+    import sys
+    heavy = ["typing", "re", "json", "dataclasses", "inspect", "krisper_cache"]
+    code = f"import sys, krisper; print([m for m in {heavy!r} if m in sys.modules])"
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run([sys.executable, "-S", "-c", code], cwd=here,
+                         capture_output=True, text=True, check=True).stdout
+    
+    assert out.strip() == "[]", f"import krisper loaded {out.strip()}"
+    print("✓ Import budget test passed")
+
+def test_optimizer():
+    """Test the optimizer folds, merges and removes ops without changing outputs"""
+    from krisper_optimizer import optimize
+    from krisper_executor import KrisperExecutor
+    
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "utf8:abc"}, "out": "x"},
+        {"op": "compare", "in": {"a": "x", "b": "x"}, "out": "cmp"},
+        {"op": "hash", "in": {"data": "ext"}, "out": "h1"},
+        {"op": "hash", "in": {"data": "ext"}, "out": "h2"},
+        {"op": "encode", "in": {"data": "h1"}, "out": "unused"}
+    ]}
+    optimized, report = optimize(ir, keep={"cmp", "h2"})
+    
+    assert report["folded"] == ["x", "cmp"]
+    assert report["merged"] == [{"out": "h2", "same_as": "h1"}]
+    assert [op.get("out") for op in report["dead"]] == ["x", "unused"]
+    assert [op["op"] for op in optimized["plan"]] == ["copy", "hash", "copy"]
+    
+    before, after = KrisperExecutor(), KrisperExecutor()
+    before.variables["ext"] = after.variables["ext"] = "external"
+    expected, actual = before.execute(ir)["outputs"], after.execute(optimized)["outputs"]
+    assert all(expected[k] == actual[k] for k in ("cmp", "h2"))
+    print("✓ Optimizer test passed")
+
+def test_fused_compress_chain():
+    """Test fused compress→hash/encode chains match op-by-op results"""
+    import krisper_executor
+    from krisper_executor import KrisperExecutor
+    from krisper_values import Base64Value
+    
+    payload = "fusion payload " * 50
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": f"utf8:{payload}"}, "params": {"level": 9}, "out": "c"},
+        {"op": "encode", "in": {"data": "c"}, "out": "e"},
+        {"op": "hash", "in": {"data": "e"}, "out": "h"},
+        {"op": "hash", "in": {"data": "c"}, "out": "hc"}
+    ]}
+    executor = KrisperExecutor()
+    assert executor._find_fusions(ir["plan"]) == {0: {0: [1, 3], 1: [2], 3: [], 2: []}}
+    
+    chunk, krisper_executor.FUSION_CHUNK = krisper_executor.FUSION_CHUNK, 7
+    try:
+        outputs = executor.execute(ir)["outputs"]
+    finally:
+        krisper_executor.FUSION_CHUNK = chunk
+    c = executor._op_compress({"payload": payload}, {"level": 9})
+    e = executor._op_encode({"data": c}, {})
+    assert outputs == {"c": c, "e": e, "h": executor._op_hash({"data": e}, {}),
+                       "hc": executor._op_hash({"data": c}, {})}
+    # Fused results are the same native values the unfused ops store
+    assert isinstance(executor.variables["c"], Base64Value) and executor.variables["c"].raw == c.raw
+    assert isinstance(executor.variables["e"], Base64Value) and executor.variables["e"].raw == e.raw
+    assert executor.variables["e"].text() == e.text()
+    print("✓ Fused compress chain test passed")
+
+def test_estimator():
+    """Test plan estimates track payload sizes, levels and base64 expansion"""
+    from krisper_estimator import CostModel, estimate
+    
+    payload = "estimate " * 1000
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": f"utf8:{payload}"}, "params": {"level": 1}, "out": "c"},
+        {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+        {"op": "encode", "in": {"data": "d"}, "out": "e"},
+        {"op": "hash", "in": {"data": "missing"}, "out": "h"}
+    ]}
+    result = estimate(ir)
+    sizes = [op["output_bytes"] for op in result["ops"]]
+    assert sizes[1] == len(payload)
+    assert sizes[2] == 4 * ((len(payload) + 2) // 3)
+    assert sizes[3] == 64
+    assert result["unknown_inputs"] == ["missing"]
+    assert result["total"]["output_bytes"] == sum(sizes)
+    assert result["total"]["peak_bytes"] >= max(op["peak_bytes"] for op in result["ops"])
+    
+    model = CostModel.from_dict(json.loads(json.dumps(CostModel.calibrate(size=4096, repeats=1).to_dict())))
+    slow = estimate({"plan": [dict(ir["plan"][0], params={"level": 9})]}, model)
+    fast = estimate({"plan": [ir["plan"][0]]}, model)
+    assert slow["total"]["cpu_seconds"] > 0 and fast["total"]["cpu_seconds"] > 0
+    assert model.codecs["lzma"]["ratio"].keys() == set(range(10))
+    
+    # Each codec is costed with its own coefficients
+    costs = {use: estimate({"plan": [dict(ir["plan"][0], params={"use": use})]})["total"]["cpu_seconds"]
+             for use in ("zlib", "bz2", "lzma")}
+    assert costs["lzma"] > 5 * costs["zlib"] and costs["bz2"] > costs["zlib"]
+    print("✓ Estimator test passed")
+
+def test_blob_refs():
+    """Test blob references resolve to mapped payloads and match inline results"""
+    from krisper_blobs import BlobStore, externalize
+    from krisper_executor import KrisperExecutor
+    
+    payload = "blob payload " * 100
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": f"utf8:{payload}"}, "out": "c"},
+        {"op": "hash", "in": {"data": f"utf8:{payload}"}, "out": "h"},
+        {"op": "compare", "in": {"a": f"utf8:{payload}", "b": "c"}, "out": "same"}
+    ]}
+    with tempfile.TemporaryDirectory() as root:
+        store = BlobStore(root)
+        external = externalize(ir, store, threshold=100)
+        ref = store.put(payload)
+        assert external["plan"][0]["in"]["payload"] == ref
+        assert len(json.dumps(external)) < 1000
+        
+        executor = KrisperExecutor(blob_store=store)
+        assert executor.execute(external)["outputs"] == KrisperExecutor().execute(ir)["outputs"]
+        assert executor._resolve_inputs({"d": ref})["d"] is store.open(ref)
+        
+        missing = executor.execute({"plan": [{"op": "hash", "in": {"data": "blob:" + "0" * 64}}]})
+        assert not missing["success"] and "Unknown blob" in missing["log"][-1]
+    print("✓ Blob reference test passed")
+
+def test_validator():
+    """Test malformed plans are rejected before any op runs"""
+    from krisper_validator import validate_ir
+    from krisper_executor import KrisperExecutor
+    
+    good = json.loads(compile_text('compress payload "abc" as x compare x with x'))
+    assert validate_ir(good) == []
+    
+    bad = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "utf8:abc"}, "params": {"level": 12}, "out": "x"},
+        {"op": "hash", "in": {"data": "y"}, "out": "h"},
+        {"op": "compare", "in": {"a": "x"}},
+        {"op": "explain", "in": {"ref": "x"}}
+    ]}
+    assert validate_ir(bad) == [
+        "op 0 (compress): invalid param level=12",
+        "op 1 (hash): undefined variable 'y'",
+        "op 2 (compare): missing input 'b/right'",
+        "op 3: unknown operation 'explain'"
+    ]
+    assert validate_ir(bad["plan"][1:2]) == ["plan: expected a list of ops"]
+    assert validate_ir({"plan": bad["plan"][1:2]}, variables={"y"}) == []
+    
+    executor = KrisperExecutor()
+    result = executor.execute(bad, validate=True)
+    assert not result["success"] and len(result["log"]) == 4
+    assert executor.variables == {}
+    print("✓ Validator test passed")
+
+def test_plan_delta():
+    """Test deltas rebuild the new plan on a worker that cached the old one"""
+    from krisper_delta import PlanCache, make_delta, plan_hash
+    from krisper_executor import KrisperExecutor
+    
+    old = json.loads(compile_text('compress payload "first" as a compress payload "second" as b compare a with b'))
+    new = json.loads(compile_text('compress payload "first" as a compress payload "changed" as b compare a with b'))
+    new["plan"].append({"op": "hash", "in": {"data": "b"}, "out": "h"})
+    delta = make_delta(old, new)
+    assert [e["edit"] for e in delta["edits"]] == ["payload", "insert"]
+    assert delta["edits"][0] == {"edit": "payload", "alias": "b", "key": "payload", "value": "utf8:changed"}
+    
+    worker = KrisperExecutor(plan_cache=PlanCache())
+    assert worker.execute(json.dumps(old))["plan_hash"] == plan_hash(old)
+    result = worker.execute(json.dumps(delta))
+    assert result["plan_hash"] == plan_hash(new)
+    assert result["outputs"] == KrisperExecutor().execute(new)["outputs"]
+    
+    stale = KrisperExecutor(plan_cache=PlanCache()).execute(delta)
+    assert not stale["success"] and stale["log"] == [f"✗ delta: Unknown base plan: {delta['base']}"]
+    
+    # Malformed edits are reported like other delta errors, never raised
+    base = plan_hash(old)
+    for edits in ([{"edit": "replace", "index": 9, "op": {"op": "hash"}}], [{"edit": "delete", "index": -1}],
+                  [{"edit": "insert", "index": True, "op": {}}], [{"edit": "replace", "index": 0}],
+                  [{"edit": "payload", "alias": "b"}], ["delete"], {"edit": "delete"}):
+        bad = worker.execute({"base": base, "edits": edits})
+        assert not bad["success"] and bad["log"][0].startswith("✗ delta:"), (edits, bad["log"])
+    for malformed in ({"base": [base], "edits": []}, {"base": {}, "edits": []},
+                      {"base": base, "target": ["x"], "edits": []}):
+        bad = worker.execute(malformed)
+        assert not bad["success"] and bad["log"][0].startswith("✗ delta:"), (malformed, bad["log"])
+    print("✓ Plan delta test passed")
+
+def test_streaming_ops():
+    """Test streaming compress/decompress round-trip files and chunk iterators"""
+    import os
+    import zlib
+    from krisper_executor import KrisperExecutor
+    
+    data = os.urandom(3000) + b"stream " * 20000
+    with tempfile.TemporaryDirectory() as root:
+        src, packed, restored = (os.path.join(root, name) for name in ("src", "packed", "restored"))
+        with open(src, "wb") as f:
+            f.write(data)
+        
+        result = KrisperExecutor().execute({"version": "0.1", "plan": [
+            {"op": "compress_stream", "in": {"source": f"file:{src}", "dest": f"file:{packed}"},
+             "params": {"level": 9, "chunk_size": 4096}, "out": "c"},
+            {"op": "decompress_stream", "in": {"source": f"file:{packed}", "dest": f"file:{restored}"},
+             "params": {"chunk_size": 1000}, "out": "d"}
+        ]}, validate=True)
+        assert result["success"], result["log"]
+        assert result["outputs"]["c"]["bytes_in"] == len(data)
+        assert result["outputs"]["d"]["bytes_out"] == len(data)
+        with open(restored, "rb") as f:
+            assert f.read() == data
+        
+        # Only a file: reference in the IR opens a file; text that starts with file: is data
+        text = KrisperExecutor().execute({"plan": [
+            {"op": "compress_stream", "in": {"source": f"utf8:file:{src}", "dest": f"file:{packed}"}, "out": "c"}
+        ]})
+        assert text["success"] and text["outputs"]["c"]["bytes_in"] == len(f"file:{src}")
+        with open(packed, "rb") as f:
+            assert zlib.decompress(f.read()) == f"file:{src}".encode()
+        spoofed = KrisperExecutor().execute({"plan": [
+            {"op": "compress_stream", "in": {"source": "utf8:x", "dest": f"utf8:file:{restored}"}, "out": "c"}
+        ]})
+        assert not spoofed["success"] and "file: reference" in spoofed["log"][-1]
+        with open(restored, "rb") as f:
+            assert f.read() == data
+    
+    executor = KrisperExecutor()
+    executor.variables["parts"] = iter(["stream ", "of ", "chunks"] * 100)
+    outputs = executor.execute({"plan": [
+        {"op": "compress_stream", "in": {"source": "parts"}, "out": "z"},
+        {"op": "decompress_stream", "in": {"source": "z"}, "params": {"chunk_size": 64}, "out": "raw"}
+    ]})["outputs"]
+    pieces = list(outputs["raw"])
+    assert max(map(len, pieces)) <= 64
+    assert b"".join(pieces) == b"stream of chunks" * 100
+    
+    # A bad source fails the op itself, not whoever iterates its result later
+    for source in ("file:/nonexistent/krisper-stream", 42):
+        for name in ("compress_stream", "decompress_stream"):
+            failed = KrisperExecutor().execute({"plan": [{"op": name, "in": {"source": source}, "out": "z"}]})
+            assert not failed["success"] and failed["log"][-1].startswith(f"✗ {name}:"), failed["log"]
+    
+    truncated = KrisperExecutor()._op_decompress_stream({"source": zlib.compress(data)[:-10]}, {})
+    try:
+        list(truncated)
+        assert False, "Should have raised for a truncated stream"
+    except ValueError:
+        pass
+    print("✓ Streaming ops test passed")
+
+def test_native_values():
+    """Test binary values stay native between ops and render only as outputs"""
+    import base64
+    import zlib
+    from krisper_executor import KrisperExecutor
+    from krisper_values import Base64Value
+    
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "utf8:native"}, "out": "c"},
+        {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+        {"op": "encode", "in": {"data": "d"}, "out": "e"},
+        {"op": "decode", "in": {"data": "e"}, "out": "back"},
+        {"op": "compare", "in": {"a": "c", "b": "utf8:" + base64.b64encode(zlib.compress(b"native")).decode()}, "out": "same"}
+    ]}
+    executor = KrisperExecutor()
+    result = executor.execute(ir, outputs=["c", "back", "same"])
+    assert result["outputs"] == {"c": base64.b64encode(zlib.compress(b"native")).decode(),
+                                 "back": "native", "same": True}
+    assert isinstance(executor.variables["c"], Base64Value)
+    assert executor.variables["c"].raw == zlib.compress(b"native")
+    assert executor.variables["e"]._ascii is None  # Never rendered
+    assert KrisperExecutor().execute(ir)["outputs"]["e"] == "bmF0aXZl"
+    print("✓ Native values test passed")
+
+def test_compiled_program():
+    """Test compiled programs match execute across runs with new bindings"""
+    from krisper_executor import KrisperExecutor
+    
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "text"}, "params": {"level": 9}, "out": "c"},
+        {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+        {"op": "compare", "in": {"a": "d", "b": "utf8:second"}, "out": "same"},
+        {"op": "hash", "in": {"data": "d"}, "out": "c"}
+    ]}
+    executor = KrisperExecutor()
+    program = executor.compile(ir, inputs=["text"])
+    for text in ("first", "second", ""):
+        executor.variables["text"] = text
+        assert program.run({"text": text}) == executor.execute(ir)["outputs"]
+    assert program.run({"text": "second"}, outputs=["same"]) == {"same": True}
+    
+    try:
+        program.run()
+        assert False, "Should have raised for a missing binding"
+    except KeyError:
+        pass
+    try:
+        executor.compile({"plan": [{"op": "decompress", "in": {"data": "utf8:abcd"}}]}).run()
+        assert False, "Should have raised for bad data"
+    except ValueError as e:
+        assert str(e).startswith("op 0 (decompress):")
+    print("✓ Compiled program test passed")
+
+def test_parallel_schedule():
+    """Test the thread-pool scheduler keeps sequential outputs and first-failure semantics"""
+    import os
+    import hashlib
+    from krisper_executor import KrisperExecutor
+    
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "utf8:" + "left " * 5000}, "out": "l"},
+        {"op": "compress", "in": {"payload": "utf8:" + "right " * 5000}, "out": "r"},
+        {"op": "hash", "in": {"data": "l"}, "out": "h"},
+        {"op": "compress", "in": {"payload": "h"}, "out": "l"},
+        {"op": "decompress", "in": {"data": "r"}, "out": "d"},
+        {"op": "compare", "in": {"a": "l", "b": "r"}, "out": "same"}
+    ]}
+    sequential = KrisperExecutor().execute(ir)
+    assert KrisperExecutor(workers=4).execute(ir) == sequential
+    
+    failing = {"plan": ir["plan"][:2] + [{"op": "decompress", "in": {"data": "utf8:abcd"}, "out": "bad"}] + ir["plan"][2:]}
+    executor = KrisperExecutor(workers=4)
+    result = executor.execute(failing)
+    assert result == KrisperExecutor().execute(failing)
+    assert not result["success"] and set(result["outputs"]) == {"l", "r"}
+    assert set(executor.variables) == {"l", "r"}
+    
+    # Ops after a side-effecting op wait for it, so a load sees the file it wrote
+    with tempfile.TemporaryDirectory() as root:
+        packed = os.path.join(root, "packed")
+        written = {"plan": [
+            {"op": "compress_stream", "in": {"source": "utf8:" + "barrier " * 1000, "dest": f"file:{packed}"}},
+            {"op": "load", "in": {"path": f"file:{packed}"}, "out": "packed"},
+            {"op": "hash", "in": {"data": "packed"}, "out": "h"}
+        ]}
+        for _ in range(20):
+            result = KrisperExecutor(workers=4).execute(written)
+            assert result["success"], result["log"]
+            with open(packed, "rb") as f:
+                assert result["outputs"]["h"] == hashlib.sha256(f.read()).hexdigest()
+            os.remove(packed)
+    print("✓ Parallel schedule test passed")
+
+def test_result_cache():
+    """Test op results are memoized within a byte budget and shared through disk"""
+    import os
+    import zlib
+    from krisper_executor import KrisperExecutor
+    from krisper_memo import ResultCache
+    
+    payload = "memoize me " * 500
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": f"utf8:{payload}"}, "params": {"level": 9}, "out": "c"},
+        {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+        {"op": "compress", "in": {"payload": "utf8:tiny"}, "out": "t"},
+        {"op": "hash", "in": {"data": "d"}, "out": "h"}
+    ]}
+    expected = KrisperExecutor().execute(ir)["outputs"]
+    with tempfile.TemporaryDirectory() as root:
+        cache = ResultCache(cache_dir=root, min_bytes=16)
+        executor = KrisperExecutor(result_cache=cache)
+        assert executor.execute(ir)["outputs"] == expected
+        assert executor.execute(ir)["outputs"] == expected
+        stats = cache.stats()
+        # The tiny compress is below min_bytes and hash is never memoized
+        assert (stats["hits"], stats["misses"]) == (2, 2) and stats["hit_rate"] == 0.5
+        assert stats["bytes_saved"] == len(payload) + len(zlib.compress(payload.encode(), 9))
+        
+        other = ResultCache(cache_dir=root, min_bytes=16)
+        assert KrisperExecutor(result_cache=other).execute(ir)["outputs"] == expected
+        assert other.stats()["disk_hits"] == 2
+    
+    small = ResultCache(max_bytes=len(payload) + 2, min_bytes=0)
+    executor = KrisperExecutor(result_cache=small)
+    executor.execute({"plan": ir["plan"][:2]})
+    assert small.stats()["evictions"] == 1 and small.size_bytes <= small.max_bytes
+    assert ResultCache(min_bytes=0).key_for("hash", {}, {"data": payload}, {}) is None
+    
+    # The disk tier keeps to its own budget and never receives oversized results
+    with tempfile.TemporaryDirectory() as root:
+        budget = ResultCache(max_bytes=len(payload) - 1, cache_dir=root, min_bytes=0, max_disk_bytes=200)
+        executor = KrisperExecutor(result_cache=budget)
+        for i in range(20):
+            executor.execute({"plan": [{"op": "compress", "in": {"payload": f"utf8:{i} {payload}"}}]})
+        executor.execute({"plan": ir["plan"][:2]})
+        files = [os.path.join(d, f) for d, _, names in os.walk(root) for f in names]
+        assert 0 < sum(map(os.path.getsize, files)) <= 200
+        assert all(os.path.getsize(f) < len(payload) for f in files)
+    print("✓ Result cache test passed")
+
+def test_codecs():
+    """Test codec selection, codec ids in the output and auto mode"""
+    import base64
+    import zlib
+    from krisper_executor import KrisperExecutor
+    from krisper_codecs import choose_codec, codec_of
+    
+    payload = "codec registry " * 400
+    plan = [{"op": "compress", "in": {"payload": f"utf8:{payload}"}, "params": {"use": use}, "out": use}
+            for use in ("zlib", "bz2", "lzma", "fibpi3d", "auto")]
+    plan += [{"op": "decompress", "in": {"data": use}, "out": f"back_{use}"} for use in ("bz2", "lzma", "auto")]
+    executor = KrisperExecutor()
+    outputs = executor.execute({"version": "0.1", "plan": plan}, validate=True)["outputs"]
+    
+    assert outputs["zlib"] == outputs["fibpi3d"] == base64.b64encode(zlib.compress(payload.encode())).decode()
+    assert codec_of(executor.variables["bz2"].raw)[0].name == "bz2"
+    assert codec_of(executor.variables["lzma"].raw)[0].name == "lzma"
+    assert all(outputs[f"back_{use}"] == payload for use in ("bz2", "lzma", "auto"))
+    
+    assert choose_codec(payload.encode(), max_latency_ms=0)[0].name == "zlib"
+    
+    # Auto choices are cached per size bucket; tiny payloads skip sampling
+    import krisper_codecs
+    entry = krisper_codecs._auto_choices[(len(payload).bit_length(), None, None)]
+    uses = entry[2]
+    krisper_codecs.compress(payload.encode(), {"use": "auto"})
+    assert entry[2] == uses - 1
+    assert krisper_codecs.compress(b"tiny", {"use": "auto"}) == zlib.compress(b"tiny")
+    bad = executor.execute({"plan": [{"op": "compress", "in": {"payload": "utf8:x"}, "params": {"use": "zstd"}}]})
+    assert not bad["success"] and "Unknown codec: zstd" in bad["log"][-1]
+    print("✓ Codecs test passed")
+
+def test_zdict():
+    """Test trained dictionaries: versioned ids, smaller output, executor round trip"""
+    import json
+    import zlib
+    import tempfile
+    from krisper_executor import KrisperExecutor
+    from krisper_zdict import ZDictStore
+    
+    samples = [json.dumps({"event": "page_view", "user_id": i, "path": f"/items/{i % 7}",
+                           "agent": "Mozilla/5.0 (X11; Linux x86_64)", "ok": True}) for i in range(200)]
+    with tempfile.TemporaryDirectory() as root:
+        store = ZDictStore(root)
+        assert store.train("events", samples[:150]) == "events@1"
+        assert store.train("events", samples[:100]) == "events@2"
+        assert ZDictStore(root).latest("events") == "events@2"
+        
+        message = samples[-1]
+        trained = store.compress(message.encode(), "events@1")
+        assert len(trained) < len(zlib.compress(message.encode())) // 2
+        assert ZDictStore(root).decompress(trained, "events@1") == message.encode()
+        
+        executor = KrisperExecutor(zdict_store=store)
+        plan = [{"op": "compress", "in": {"payload": f"utf8:{message}"}, "params": {"dict": "events@1"}, "out": "c"},
+                {"op": "decompress", "in": {"data": "c"}, "params": {"dict": "events@1"}, "out": "d"},
+                {"op": "decompress", "in": {"data": "c"}, "out": "e"}]
+        result = executor.execute({"plan": plan[:2]}, validate=True)
+        assert result["success"] and result["outputs"]["d"] == message
+        missing = executor.execute({"plan": plan[:1] + plan[2:]})
+        assert not missing["success"] and "pass params.dict" in missing["log"][-1]
+        garbage = executor.execute({"plan": [{"op": "decompress", "in": {"data": "utf8:ASBnYXJiYWdl"}}]})
+        assert not garbage["success"] and "incorrect header check" in garbage["log"][-1], garbage["log"]
+        unknown = executor.execute({"plan": [dict(plan[0], params={"dict": "events@9"})]})
+        assert not unknown["success"] and "Unknown dictionary: events@9" in unknown["log"][-1]
+    print("✓ Trained dictionary test passed")
+
+def test_execute_batch():
+    """Test execute_batch matches per-record execute and isolates failing records"""
+    import hashlib
+    from krisper_executor import KrisperExecutor
+    
+    ir = {"version": "0.1", "plan": [
+        {"op": "compress", "in": {"payload": "record"}, "out": "c"},
+        {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+        {"op": "hash", "in": {"data": "d"}, "out": "h"}
+    ]}
+    records = [{"record": f"row {i} " * (i % 5)} for i in range(10)]
+    executor = KrisperExecutor()
+    expected = []
+    for record in records:
+        executor.variables.update(record)
+        expected.append(executor.execute(ir)["outputs"])
+    executor.variables.clear()
+    
+    results = list(executor.execute_batch(ir, iter(records), chunk_size=3))
+    assert [result["outputs"] for result in results] == expected
+    assert all(result["success"] and result["log"] == [] for result in results)
+    assert "record" not in executor.variables
+    
+    mixed = list(executor.execute_batch(ir, [{"record": "a"}, {"other": "b"}, {"record": 7}, {"record": "c"}],
+                                        outputs=["h"]))
+    assert [result["success"] for result in mixed] == [True, False, False, True]
+    assert mixed[1]["log"] == ["✗ Missing binding: record"]
+    assert mixed[2]["log"][0].startswith("✗ op 0 (compress):")
+    assert list(mixed[3]["outputs"]) == ["h"]
+    assert list(executor.execute_batch(ir, [])) == []
+    
+    # Inputs come from the plan, not from whichever keys the first record has
+    hashed = list(executor.execute_batch({"plan": [{"op": "hash", "in": {"data": "x"}, "out": "h"}]},
+                                         [{"y": "a"}, {"x": "hello"}]))
+    assert hashed[0] == {"success": False, "outputs": {}, "log": ["✗ Missing binding: x"]}
+    assert hashed[1]["outputs"]["h"] == hashlib.sha256(b"hello").hexdigest()
+    explicit = list(executor.execute_batch({"plan": [{"op": "copy", "in": {"value": "tag"}, "out": "t"}]},
+                                           [{"y": 1}], inputs=[]))
+    assert explicit[0]["outputs"] == {"t": "tag"}
+    try:
+        list(executor.execute_batch({"plan": [{"op": "hash", "in": {}}]}, records, validate=True))
+        assert False, "Should have rejected the plan"
+    except ValueError:
+        pass
+    print("✓ Batch execution test passed")
+
+def test_async_executor():
+    """Test the async executor against a local HTTP server"""
+    import os
+    import hashlib
+    import asyncio
+    import threading
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+    from krisper_async import AsyncKrisperExecutor
+    
+    body = b"async payload " * 6000
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            if self.path == "/moved":
+                self.send_response(302)
+                self.send_header("Location", "/data")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif self.path.startswith("/data"):
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.txt")
+            plan = {"version": "0.1", "plan": [
+                {"op": "http_get", "in": {"url": f"utf8:{base}/moved"}, "out": "page"},
+                {"op": "compress", "in": {"payload": "page"}, "out": "c"},
+                {"op": "decompress", "in": {"data": "c"}, "out": "d"},
+                {"op": "write_file", "in": {"data": "d", "path": f"file:{path}"}, "out": "written"},
+                {"op": "loop", "params": {"count": 2, "body": [{"op": "sleep", "params": {"seconds": 0}}]},
+                 "out": "iterations"}
+            ]}
+            executor = AsyncKrisperExecutor(offload_bytes=1024)
+            
+            async def main():
+                return await executor.execute_many([
+                    plan,
+                    {"plan": [{"op": "http_get", "in": {"url": f"utf8:{base}/data{i}"}, "out": f"p{i}"}
+                              for i in range(4)]},
+                    {"plan": [{"op": "http_get", "in": {"url": f"utf8:{base}/missing"}}]},
+                ], validate=True)
+            
+            first, second, missing = asyncio.run(main())
+            assert first["success"], first["log"]
+            assert first["outputs"]["written"]["bytes_out"] == len(body)
+            assert first["outputs"]["iterations"] == 2
+            with open(path, "rb") as f:
+                assert f.read() == body
+            assert second["success"] and all(second["outputs"][f"p{i}"] == body for i in range(4))
+            assert not missing["success"] and "HTTP 404" in missing["log"][-1]
+            assert executor.variables["d"] == body.decode()
+            
+            # Loop bodies are validated like plans and cannot see the enclosing plan's outputs
+            bad = asyncio.run(executor.execute({"plan": [
+                {"op": "copy", "in": {"value": "utf8:x"}, "out": "local"},
+                {"op": "loop", "params": {"count": 1, "body": [
+                    {"op": "run", "in": {}},
+                    {"op": "copy", "in": {"value": "local"}},
+                    {"op": "loop", "params": {"body": [{"op": "bogus"}]}}]}}
+            ]}, validate=True))
+            assert not bad["success"]
+            assert bad["log"] == [
+                "✗ op 1 (loop) body: op 0 (run): missing input 'cmd'",
+                "✗ op 1 (loop) body: op 1 (copy): undefined variable 'local'",
+                "✗ op 1 (loop) body: op 2 (loop) body: op 0: unknown operation 'bogus'",
+            ], bad["log"]
+            
+            # A load waits for the write_file before it
+            copy = os.path.join(tmp, "copy.txt")
+            reread = asyncio.run(executor.execute({"plan": [
+                {"op": "write_file", "in": {"data": "d", "path": f"file:{copy}"}},
+                {"op": "load", "in": {"path": f"file:{copy}"}, "out": "copied"},
+                {"op": "hash", "in": {"data": "copied"}, "out": "h"}
+            ]}))
+            assert reread["success"], reread["log"]
+            assert reread["outputs"]["h"] == hashlib.sha256(body).hexdigest()
+            
+            # Text that starts with file: is written as text, never read as a path
+            note = os.path.join(tmp, "note.txt")
+            wrote = asyncio.run(executor.execute({"plan": [
+                {"op": "write_file", "in": {"data": f"utf8:file:{path}", "path": f"file:{note}"}},
+                {"op": "write_file", "in": {"data": "utf8:x", "path": f"utf8:file:{note}"}}
+            ]}))
+            assert not wrote["success"] and "file: reference" in wrote["log"][-1], wrote["log"]
+            with open(note, "rb") as f:
+                assert f.read() == f"file:{path}".encode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✓ Async executor test passed")
+
+def test_load_op():
+    """Test load maps files for hash, compress and compare without truncation"""
+    import os
+    import zlib
+    import base64
+    import hashlib
+    from krisper_executor import KrisperExecutor, COMPARE_CHUNK
+    from krisper_optimizer import optimize
+    
+    text = "".join(f"line {i}\n" for i in range(60000))
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for name, content in (("a", text), ("b", text), ("c", text[:-1] + "!"), ("empty", "")):
+            paths[name] = os.path.join(tmp, name)
+            with open(paths[name], "w") as f:
+                f.write(content)
+        ir = {"version": "0.1", "plan": [
+            {"op": "load", "in": {"path": f"file:{paths['a']}"}, "out": "a"},
+            {"op": "load", "in": {"path": f"file:{paths['b']}"}, "out": "b"},
+            {"op": "load", "in": {"path": f"file:{paths['c']}"}, "out": "c"},
+            {"op": "load", "in": {"path": f"file:{paths['empty']}"}, "out": "empty"},
+            {"op": "hash", "in": {"data": "a"}, "out": "digest"},
+            {"op": "compress", "in": {"payload": "a"}, "out": "packed"},
+            {"op": "decompress", "in": {"data": "packed"}, "out": "unpacked"},
+            {"op": "compare", "in": {"a": "a", "b": "b"}, "out": "same"},
+            {"op": "compare", "in": {"a": "a", "b": "c"}, "out": "differs"},
+            {"op": "compare", "in": {"a": "unpacked", "b": "a"}, "out": "round_trip"},
+            {"op": "hash", "in": {"data": "empty"}, "out": "empty_digest"}
+        ]}
+        executor = KrisperExecutor()
+        result = executor.execute(ir, validate=True, outputs=["digest", "same", "differs", "round_trip", "empty_digest"])
+        assert result["success"], result["log"]
+        assert len(text) > 2 * COMPARE_CHUNK
+        assert isinstance(executor.variables["a"], memoryview)
+        assert result["outputs"] == {
+            "digest": hashlib.sha256(text.encode()).hexdigest(),
+            "same": True, "differs": False, "round_trip": True,
+            "empty_digest": hashlib.sha256(b"").hexdigest(),
+        }
+        assert optimize(ir)[0]["plan"][0]["op"] == "load"
+        missing = executor.execute({"plan": [{"op": "load", "in": {"path": f"file:{tmp}/nope"}}]})
+        assert not missing["success"]
+        
+        # compress_tool keeps binary files whole and verifies them by hash
+        import io
+        import contextlib
+        import compress_tool
+        binary = os.path.join(tmp, "random.bin")
+        with open(binary, "wb") as f:
+            f.write(os.urandom(20000))
+        report = io.StringIO()
+        with contextlib.redirect_stdout(report):
+            compress_tool.compress_file(binary)
+        assert "✓ Decompression verified" in report.getvalue()
+        with open(binary + ".kz", "rb") as f:
+            with open(binary, "rb") as original:
+                assert zlib.decompress(base64.b64decode(f.read())) == original.read()
+    print("✓ Load op test passed")
+
+def test_plain_speak_dispatch():
+    """Test first-word dispatch keeps the linear scan's choices"""
+    import re
+    import sys
+    import types
+    
+    class Program:
+        """Stand-in for tools.krisper_ir.Program, which is not in this tree"""
+        def __init__(self):
+            self.steps = []
+        
+        def add(self, kind, **args):
+            self.steps.append((kind, args))
+            return self
+    
+    stub = types.ModuleType("tools.krisper_ir")
+    stub.Program = Program
+    saved = {name: sys.modules.get(name) for name in ("tools", "tools.krisper_ir", "plain_speak_compiler")}
+    sys.modules.update({"tools": types.ModuleType("tools"), "tools.krisper_ir": stub})
+    sys.modules.pop("plain_speak_compiler", None)
+    try:
+        import plain_speak_compiler as ps
+        ps.register_verb(r"^stop now$|^halt$", lambda m, p: p.add("stop"))
+        ps.register_verb(r"^(?:ping|pong) (?P<host>\S+)$", lambda m, p: p.add("ping", host=m["host"]))
+        ps.register_verb(r"^run twice (?P<cmd>.+)$", lambda m, p: p.add("twice", cmd=m["cmd"]))
+        
+        def linear(line):
+            for pat, fn in ps.VERBS:
+                m = re.match(pat, line, flags=re.I)
+                if m:
+                    return fn(m, Program()).steps
+            return [("comment", {"text": line})]
+        
+        lines = ["download http://x/a to /tmp/a", "RUN \"ls -l\"", "run twice date", "Sleep 5",
+                 "every 10s: uptime", "write 'hi' to f.txt", "halt", "STOP NOW", "pong example.org",
+                 "dance wildly", "sleep soon"]
+        assert ps.compile_lines(lines).steps == [step for line in lines for step in linear(line)]
+        # run twice is registered after the generic run verb, which still wins
+        assert ps.compile_lines(["run twice date"]).steps == [("run", {"cmd": "twice date"})]
+        assert ps.compile_lines(["halt", "dance"]).steps == [("stop", {}), ("comment", {"text": "dance"})]
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    print("✓ Plain-speak dispatch test passed")
+
 def run_all_tests():
     """Run all tests"""
     print("Running KRISPER Test Suite...")
@@ -99,7 +933,32 @@ def run_all_tests():
         test_empty_payload,
         test_explain_operation,
         test_attest_operation,
-        test_multiple_compressions
+        test_multiple_compressions,
+        test_statement_order,
+        test_compile_cache,
+        test_compile_stream,
+        test_compile_many,
+        test_compile_session,
+        test_binary_ir,
+        test_shared_compiler_threads,
+        test_import_budget,
+        test_optimizer,
+        test_fused_compress_chain,
+        test_estimator,
+        test_blob_refs,
+        test_validator,
+        test_plan_delta,
+        test_streaming_ops,
+        test_native_values,
+        test_compiled_program,
+        test_parallel_schedule,
+        test_result_cache,
+        test_codecs,
+        test_zdict,
+        test_execute_batch,
+        test_async_executor,
+        test_load_op,
+        test_plain_speak_dispatch
     ]
     
     passed = 0